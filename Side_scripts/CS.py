@@ -3,6 +3,7 @@ import numpy as np
 import pygame
 from pygame.locals import DOUBLEBUF, OPENGL
 from pyrr import Matrix44
+import scene_state
 
 # Initialize Pygame with OpenGL context
 pygame.init()
@@ -69,27 +70,34 @@ camera_pos = np.array([10.0, 10.0, 10.0])
 target = np.array([0.0, 0.0, 0.0])
 view = Matrix44.look_at(camera_pos, target, [0.0, 1.0, 0.0])
 
+# The MVP never changes, so after the first frame the loop only wakes up for
+# input or a window expose
+scene = scene_state.SceneState()
+
 # Main loop
 running = True
 while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-            running = False
-
-    ctx.clear(0.05, 0.05, 0.05)
-
     mvp = proj * view
-    mvp_uniform.write(mvp.astype('f4').tobytes())
+    if not scene.dirty(mvp.astype('f4').tobytes()):
+        events = scene.wait()
+    else:
+        ctx.clear(0.05, 0.05, 0.05)
+        mvp_uniform.write(mvp.astype('f4').tobytes())
+
+        # Draw axes
+        color_uniform.value = (1.0, 1.0, 1.0)
+        axes_vao.render(moderngl.LINES)
 
-    # Draw axes
-    color_uniform.value = (1.0, 1.0, 1.0)
-    axes_vao.render(moderngl.LINES)
+        # Draw grid
+        color_uniform.value = (0.8, 0.8, 0.8)
+        grid_vao.render(moderngl.LINES)
 
-    # Draw grid
-    color_uniform.value = (0.8, 0.8, 0.8)
-    grid_vao.render(moderngl.LINES)
+        pygame.display.flip()
+        clock.tick(60)
+        events = pygame.event.get()
 
-    pygame.display.flip()
-    clock.tick(60)
+    for event in events:
+        if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+            running = False
 
 pygame.quit()
\ No newline at end of file
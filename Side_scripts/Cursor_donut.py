@@ -1,6 +1,5 @@
 import pygame
-import math
-import colorsys
+import torus_engine
 
 pygame.init()
 
@@ -37,23 +36,9 @@ SHADOW_COLOR = (30, 40, 80)
 MID_COLOR = (180, 180, 200)
 HIGHLIGHT_COLOR = (220, 240, 255)
 
-# Utility functions
-def normalize(v):
-    l = math.sqrt(sum(i * i for i in v))
-    return [i / l for i in v] if l != 0 else v
-
-def dot(a, b):
-    return sum(i * j for i, j in zip(a, b))
-
-def lerp_color(c1, c2, t):
-    return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
-
-def project_point(px, py, pz):
-    z = pz + 5
-    ooz = 1 / z
-    xp = int(x_offset + 80 * ooz * px)
-    yp = int(y_offset + 40 * ooz * py)
-    return xp, yp, ooz
+# Depth/color grid and dot surface, allocated once and reused by every frame
+buffers = torus_engine.FrameBuffers(columns, rows)
+presenter = torus_engine.DotPresenter(columns, rows, x_separator, y_separator, min(x_separator, y_separator) // 2)
 
 # Init screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -63,8 +48,6 @@ run = True
 
 while run:
     screen.fill((0, 0, 0))
-    zbuffer = [0.0] * screen_size
-    colorbuffer = [(0, 0, 0, 0)] * screen_size
 
     if dragging and last_mouse_pos:
         mx, my = pygame.mouse.get_pos()
@@ -79,53 +62,12 @@ while run:
         if 'Y' in active_axes: B += 0.3
         if 'Z' in active_axes: C += 0.3
 
-    for theta_deg in range(0, 360, theta_spacing):
-        theta = math.radians(theta_deg)
-        cost, sint = math.cos(theta), math.sin(theta)
-        for phi_deg in range(0, 360, phi_spacing):
-            phi = math.radians(phi_deg)
-            cosp, sinp = math.cos(phi), math.sin(phi)
-            circlex = R2 + R1 * cost
-            circley = R1 * sint
-            x = circlex * (math.cos(B) * cosp + math.sin(A) * math.sin(B) * sinp) - circley * math.cos(A) * math.sin(B)
-            y = circlex * (math.sin(B) * cosp - math.sin(A) * math.cos(B) * sinp) + circley * math.cos(A) * math.cos(B)
-            z = circlex * math.cos(A) * sinp + circley * math.sin(A)
-            x_rot = x * math.cos(C) - y * math.sin(C)
-            y_rot = x * math.sin(C) + y * math.cos(C)
-            x, y = x_rot, y_rot
-            xp, yp, ooz = project_point(x, y, z)
-            idx = xp + columns * yp
-            if 0 <= xp < columns and 0 <= yp < rows:
-                nx = cost * cosp
-                ny = cost * sinp
-                nz = sint
-                norm = normalize([nx, ny, nz])
-                lum = dot(norm, normalize(light))
-                lum = max(0, min(1, lum))
-                if ooz > zbuffer[idx]:
-                    zbuffer[idx] = ooz
-                    base = lerp_color(SHADOW_COLOR, MID_COLOR, lum * 2) if lum < 0.5 else lerp_color(MID_COLOR, HIGHLIGHT_COLOR, (lum - 0.5) * 2)
-                    shade = 0.7 + 0.6 * ooz
-                    shaded = tuple(min(255, int(c * shade)) for c in base)
-                    r, g, b = [c / 255 for c in shaded]
-                    h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                    h = (h + hue) % 1.0
-                    final_color = tuple(int(c * 255) for c in colorsys.hsv_to_rgb(h, s, v))
-                    alpha = 100 if transparent_mode else 255
-                    colorbuffer[idx] = (*final_color, alpha)
-
-    donut_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    x_pos = y_pos = 0
-    radius = min(x_separator, y_separator) // 2
-    for i in range(screen_size):
-        if colorbuffer[i][3] > 0:
-            center = (x_pos + x_separator // 2, y_pos + y_separator // 2)
-            pygame.draw.circle(donut_surface, colorbuffer[i], center, radius)
-        if (i + 1) % columns == 0:
-            x_pos = 0
-            y_pos += y_separator
-        else:
-            x_pos += x_separator
+    geometry = torus_engine.get_geometry(R1, R2, theta_spacing, phi_spacing)
+    torus_engine.render_torus(
+        geometry, A, B, C, buffers, light,
+        (SHADOW_COLOR, MID_COLOR, HIGHLIGHT_COLOR), hue=hue)
+    alpha = 100 if transparent_mode else 255
+    donut_surface = presenter.present(buffers, alpha)
 
     screen.blit(donut_surface, (0, 0))
 
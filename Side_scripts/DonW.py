@@ -1,8 +1,9 @@
 import pygame
-import math
-import colorsys
-
-pygame.init()
+import torus_engine
+import frame_profiler
+import lod
+import frame_archive
+import scene_manager
 
 # Screen and grid setup
 WIDTH, HEIGHT = 1280, 720
@@ -12,7 +13,7 @@ rows = HEIGHT // y_separator
 screen_size = rows * columns
 x_offset = columns / 2
 y_offset = rows / 2
-font = pygame.font.Font("NK57 Monospace Cd Bd.otf", 20)
+font = None  # from the shared font cache on first use
 
 # Torus configuration
 R1, R2 = 1.1, 2.5
@@ -36,44 +37,112 @@ transparent_mode = False
 zoom_level = 0  # 0, 1, 2, 3 (cycles back to 0)
 zoom_scales = [1.0, 1.5, 2.0, 2.5]  # Zoom multipliers
 
+# Per-stage profiler, toggled with P; the trace is written when it stops
+profiler = frame_profiler.FrameProfiler()
+TRACE_PATH = "frame_trace.json"
+
+# Adaptive sample density for a 60 fps target, toggled with O
+detail = lod.LODController(target_fps=60)
+
+# Coverage-aware sampling (S): sample density follows the projected footprint
+coverage_sampling = False
+
+# Fused numba kernel instead of the NumPy stages, chosen at startup (--fused)
+fused = False
+
+# Kiosk replay (--archive PATH): a looping spin recorded once into a
+# frame_archive and played back until the view or a render toggle changes
+archive_path = None
+ARCHIVE_FRAMES = 500
+ARCHIVE_A_STEP = frame_archive.closed_step(0.02, ARCHIVE_FRAMES)
+ARCHIVE_B_STEP = frame_archive.closed_step(0.01, ARCHIVE_FRAMES)
+ARCHIVE_HUE_STEP = frame_archive.closed_step(0.004, ARCHIVE_FRAMES, 1.0)
+
 # Colors
 SHADOW_COLOR = (30, 40, 80)
 MID_COLOR = (180, 180, 200)
 HIGHLIGHT_COLOR = (220, 240, 255)
 
-# Utility functions
-def normalize(v):
-    l = math.sqrt(sum(i * i for i in v))
-    return [i / l for i in v] if l != 0 else v
-
-def dot(a, b):
-    return sum(i * j for i, j in zip(a, b))
-
-def lerp_color(c1, c2, t):
-    return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
-
-def project_point(px, py, pz):
-    z = pz + 5
-    ooz = 1 / z
-    zoom_scale = zoom_scales[zoom_level]
-    xp = int(x_offset + 80 * ooz * px * zoom_scale)
-    yp = int(y_offset + 40 * ooz * py * zoom_scale)
-    return xp, yp, ooz
-
-def run_donut():
-    global A, B, C, active_axes, auto_rotate, dragging, last_mouse_pos, sensitivity, hue, transparent_mode, zoom_level
-    global screen, font, WIDTH, HEIGHT, x_separator, y_separator, columns, rows, screen_size, x_offset, y_offset
-    global R1, R2, theta_spacing, phi_spacing, light, zoom_scales
-    
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Donut with Axis/Plane Control")
-    clock = pygame.time.Clock()
-    run = True
-    while run:
+def archive_params():
+    """Everything that changes the recorded frames"""
+    return {"scene": "DonW", "R1": R1, "R2": R2, "separators": [x_separator, y_separator],
+            "spacing": [theta_spacing, phi_spacing], "light": light, "zoom": zoom_scales[zoom_level],
+            "theme": [SHADOW_COLOR, MID_COLOR, HIGHLIGHT_COLOR],
+            "steps": [ARCHIVE_A_STEP, ARCHIVE_B_STEP, ARCHIVE_HUE_STEP]}
+
+def replay_state():
+    """What the archive replay depends on; any change ends the replay"""
+    return (A, B, C, zoom_level, coverage_sampling, torus_engine.backface_culling, detail.enabled)
+
+def render_archive_frame(buffers, index):
+    """Frame `index` of the recorded spin"""
+    geometry = torus_engine.get_geometry(R1, R2, theta_spacing, phi_spacing)
+    torus_engine.render_torus(
+        geometry, index * ARCHIVE_A_STEP, index * ARCHIVE_B_STEP, 0.0, buffers, light,
+        (SHADOW_COLOR, MID_COLOR, HIGHLIGHT_COLOR),
+        hue=index * ARCHIVE_HUE_STEP, zoom=zoom_scales[zoom_level])
+
+class DonWScene(scene_manager.Scene):
+    """The interactive donut as a scene, so the launcher can run it in its own window"""
+
+    name = "DonW"
+    caption = "Donut with Axis/Plane Control"
+    fps = 60
+
+    def __init__(self, offscreen=False):
+        self.offscreen = offscreen  # rendering for a FrameSink: no archive replay
+        self.prepared = False
+        self.profiler = profiler
+
+    def enter(self, manager):
+        global screen
+        self.clock = manager.clock
+        screen = manager.screen
+        self._prepare()
+
+    def prewarm(self, cancelled):
+        """Grid, presenter, geometry, shading LUT (or fused kernel compile) and first frame"""
+        self._prepare()
+        if cancelled():
+            return
+        geometry = torus_engine.get_geometry(R1, R2, theta_spacing, phi_spacing)
+        if cancelled():
+            return
+        # Same view as the first real frame, which then only reruns the color pass
+        self.render_torus(
+            geometry, A, B, C, self.buffers, light,
+            (SHADOW_COLOR, MID_COLOR, HIGHLIGHT_COLOR),
+            hue=hue, zoom=zoom_scales[zoom_level])
+
+    def _prepare(self):
+        global columns, rows, screen_size, x_offset, y_offset, font
+        if self.prepared:
+            return
+        # Grid follows the current screen/separator settings; the depth/color grid
+        # and dot surface are allocated once and reused by every frame
+        columns, rows = WIDTH // x_separator, HEIGHT // y_separator
+        screen_size = rows * columns
+        x_offset, y_offset = columns / 2, rows / 2
+        self.buffers = torus_engine.FrameBuffers(columns, rows)
+        font = scene_manager.get_font(scene_manager.FONT_PATH, 20)
+        if fused:
+            import fused_kernel  # loads numba, so only when asked for
+            self.render_torus = fused_kernel.select(fused)
+        else:
+            self.render_torus = torus_engine.render_torus
+        self.presenter = torus_engine.DotPresenter(columns, rows, x_separator, y_separator,
+                                                   min(x_separator, y_separator) // 2)
+        self.archive = None
+        if archive_path is not None and not self.offscreen:
+            self.archive = frame_archive.load_or_record(archive_path, archive_params(), columns, rows,
+                                                        ARCHIVE_FRAMES, render_archive_frame)
+            self.archive_state, self.archive_frame = replay_state(), 0
+        self.prepared = True
+
+    def render(self, screen):
+        global A, B, C, last_mouse_pos, hue
+        buffers, archive = self.buffers, self.archive
         screen.fill((0, 0, 0))
-        zbuffer = [0.0] * screen_size
-        colorbuffer = [(0, 0, 0, 0)] * screen_size
         if dragging and last_mouse_pos:
             mx, my = pygame.mouse.get_pos()
             dx, dy = mx - last_mouse_pos[0], my - last_mouse_pos[1]
@@ -85,83 +154,81 @@ def run_donut():
             if 'X' in active_axes: A += 0.3
             if 'Y' in active_axes: B += 0.3
             if 'Z' in active_axes: C += 0.3
-        for theta_deg in range(0, 360, theta_spacing):
-            theta = math.radians(theta_deg)
-            cost, sint = math.cos(theta), math.sin(theta)
-            for phi_deg in range(0, 360, phi_spacing):
-                phi = math.radians(phi_deg)
-                cosp, sinp = math.cos(phi), math.sin(phi)
-                circlex = R2 + R1 * cost
-                circley = R1 * sint
-                x = circlex * (math.cos(B) * cosp + math.sin(A) * math.sin(B) * sinp) - circley * math.cos(A) * math.sin(B)
-                y = circlex * (math.sin(B) * cosp - math.sin(A) * math.cos(B) * sinp) + circley * math.cos(A) * math.cos(B)
-                z = circlex * math.cos(A) * sinp + circley * math.sin(A)
-                x_rot = x * math.cos(C) - y * math.sin(C)
-                y_rot = x * math.sin(C) + y * math.cos(C)
-                x, y = x_rot, y_rot
-                xp, yp, ooz = project_point(x, y, z)
-                idx = xp + columns * yp
-                if 0 <= xp < columns and 0 <= yp < rows:
-                    nx = cost * cosp
-                    ny = cost * sinp
-                    nz = sint
-                    norm = normalize([nx, ny, nz])
-                    lum = dot(norm, normalize(light))
-                    lum = max(0, min(1, lum))
-                    if ooz > zbuffer[idx]:
-                        zbuffer[idx] = ooz
-                        base = lerp_color(SHADOW_COLOR, MID_COLOR, lum * 2) if lum < 0.5 else lerp_color(MID_COLOR, HIGHLIGHT_COLOR, (lum - 0.5) * 2)
-                        shade = 0.7 + 0.6 * ooz
-                        shaded = tuple(min(255, int(c * shade)) for c in base)
-                        r, g, b = [c / 255 for c in shaded]
-                        h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                        h = (h + hue) % 1.0
-                        final_color = tuple(int(c * 255) for c in colorsys.hsv_to_rgb(h, s, v))
-                        alpha = 100 if transparent_mode else 255
-                        # Ensure final_color is always a tuple of 3 elements
-                        if len(final_color) == 3:
-                            colorbuffer[idx] = (final_color[0], final_color[1], final_color[2], alpha)
-                        else:
-                            colorbuffer[idx] = (0, 0, 0, alpha)
-        donut_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        x_pos = y_pos = 0
-        radius = min(x_separator, y_separator) // 2
-        for i in range(screen_size):
-            if colorbuffer[i][3] > 0:
-                center = (x_pos + x_separator // 2, y_pos + y_separator // 2)
-                pygame.draw.circle(donut_surface, colorbuffer[i], center, radius)
-            if (i + 1) % columns == 0:
-                x_pos = 0
-                y_pos += y_separator
+        if archive is not None and replay_state() != self.archive_state:
+            # Left the recorded spin: carry on live from the frame on screen
+            index = max(self.archive_frame - 1, 0)
+            A0, B0, C0 = self.archive_state[:3]
+            A, B, C = index * ARCHIVE_A_STEP + A - A0, index * ARCHIVE_B_STEP + B - B0, C - C0
+            hue = index * ARCHIVE_HUE_STEP
+            self.archive = archive = None
+        replaying = archive is not None
+        if not replaying:
+            with profiler.stage("geometry"):
+                if coverage_sampling:
+                    geometry = torus_engine.coverage_geometry(R1, R2, A, B, C, columns, rows, zoom=zoom_scales[zoom_level])
+                else:
+                    geometry = torus_engine.get_geometry(R1, R2, theta_spacing, phi_spacing)
+            self.render_torus(
+                geometry, A, B, C, buffers, light,
+                (SHADOW_COLOR, MID_COLOR, HIGHLIGHT_COLOR),
+                hue=hue, zoom=zoom_scales[zoom_level], profiler=profiler)
+        with profiler.stage("present"):
+            alpha = 100 if transparent_mode else 255
+            if replaying:
+                donut_surface = self.presenter.present_colors(archive.frame(self.archive_frame), alpha)
+                self.archive_frame += 1
             else:
-                x_pos += x_separator
-        screen.blit(donut_surface, (0, 0))
-        axes_display = ''.join(sorted(a.lower() for a in active_axes)) or "none"
-        axis_text = font.render(f"Axes: {axes_display}", True, (255, 255, 255))
-        rotate_text = font.render(f"Auto Rotate: {'ON' if auto_rotate else 'OFF'}", True, (255, 255, 255))
-        zoom_text = font.render(f"Zoom: {zoom_scales[zoom_level]:.1f}x", True, (255, 255, 255))
-        help_lines = [
-            "Help",
-            "Auto Rotate: press R",
-            "Reset Position: press E",
-            "Transparency Toggle: press T",
-            "Zoom: press 7",
-            "For X-axis: press X",
-            "For Y-axis: press Y",
-            "For Z-axis: press Z",
-        ]
-        screen.blit(axis_text, (10, 10))
-        screen.blit(rotate_text, (10, 35))
-        screen.blit(zoom_text, (10, 60))
-        for i, line in enumerate(help_lines):
-            text = font.render(line, True, (180, 180, 180))
-            screen.blit(text, (10, 95 + i * 25))
-        pygame.display.flip()
+                donut_surface = self.presenter.present(buffers, alpha)
+            screen.blit(donut_surface, (0, 0))
+        with profiler.stage("hud"):
+            axes_display = ''.join(sorted(a.lower() for a in active_axes)) or "none"
+            axis_text = font.render(f"Axes: {axes_display}", True, (255, 255, 255))
+            rotate_text = font.render(f"Auto Rotate: {'ON' if auto_rotate else 'OFF'}", True, (255, 255, 255))
+            zoom_text = font.render(f"Zoom: {zoom_scales[zoom_level]:.1f}x", True, (255, 255, 255))
+            if replaying:
+                detail_label = f"archive frame {self.archive_frame % len(archive)}/{len(archive)}"
+            elif coverage_sampling:
+                coverage = torus_engine.coverage_report(buffers)
+                detail_label = (f"coverage ({geometry.size} samples, holes {coverage['hole_ratio']:.1%}, "
+                                f"{coverage['overdraw']:.1f}/cell)")
+            else:
+                detail_label = detail.label()
+            if torus_engine.backface_culling and not replaying:
+                detail_label += f", {buffers.culled} culled"
+            detail_text = font.render(f"Detail: {detail_label}", True, (255, 255, 255))
+            help_lines = [
+                "Help",
+                "Auto Rotate: press R",
+                "Reset Position: press E",
+                "Transparency Toggle: press T",
+                "Zoom: press 7",
+                "For X-axis: press X",
+                "For Y-axis: press Y",
+                "For Z-axis: press Z",
+                "Profiler: press P",
+                "Auto Detail: press O",
+                "Coverage Sampling: press S",
+                "Back-face Culling: press B",
+            ]
+            screen.blit(axis_text, (10, 10))
+            screen.blit(rotate_text, (10, 35))
+            screen.blit(zoom_text, (10, 60))
+            screen.blit(detail_text, (10, 85))
+            for i, line in enumerate(help_lines):
+                text = font.render(line, True, (180, 180, 180))
+                screen.blit(text, (10, 120 + i * 25))
+        if profiler.enabled:
+            profiler.draw_overlay(screen, font, WIDTH - 280, 10)
         hue += 0.004
-        clock.tick(60)
-        for event in pygame.event.get():
+
+    def update(self, events):
+        global A, B, C, active_axes, auto_rotate, dragging, last_mouse_pos, transparent_mode, zoom_level
+        global theta_spacing, phi_spacing, coverage_sampling
+        theta_spacing, phi_spacing = detail.update(self.clock.get_rawtime(), zoom_scales[zoom_level])
+        profiler.end_frame()
+        for event in events:
             if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-                run = False
+                return False
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 dragging = True
                 last_mouse_pos = pygame.mouse.get_pos()
@@ -183,6 +250,48 @@ def run_donut():
                     active_axes ^= {'Y'}
                 elif event.key == pygame.K_z:
                     active_axes ^= {'Z'}
+                elif event.key == pygame.K_s:
+                    coverage_sampling = not coverage_sampling
+                elif event.key == pygame.K_b:
+                    torus_engine.backface_culling = not torus_engine.backface_culling
+                elif event.key == pygame.K_o:
+                    detail.enabled = not detail.enabled
+                elif event.key == pygame.K_p:
+                    if not profiler.toggle():
+                        profiler.export_trace(TRACE_PATH)
+        return True
+
+    def exit(self):
+        global dragging, last_mouse_pos
+        dragging, last_mouse_pos = False, None
+        if profiler.enabled:
+            profiler.export_trace(TRACE_PATH)
+
+def run_donut(sink=None):
+    """Interactive window, or render the frames of an offscreen.FrameSink schedule"""
+    global A, B, C
+    scene_manager.init()
+    if sink is None:
+        manager = scene_manager.SceneManager(pygame.display.set_mode((WIDTH, HEIGHT)))
+        manager.run(DonWScene())
+        return
+    manager = scene_manager.SceneManager(sink.open((WIDTH, HEIGHT)))
+    scene = DonWScene(offscreen=True)
+    scene.enter(manager)
+    while not sink.done:
+        A, B, C = sink.angles
+        scene.render(manager.screen)
+        profiler.end_frame()
+        sink.add()
+    scene.exit()
+    return sink.frames
 
 if __name__ == "__main__":
+    import sys
+
+    # usage: python DonW.py [--fused] [--archive PATH]
+    # --fused needs numba, which is optional and not in requirements.txt: pip install numba
+    args = sys.argv[1:]
+    fused = "--fused" in args
+    archive_path = args[args.index("--archive") + 1] if "--archive" in args else None
     run_donut()
\ No newline at end of file
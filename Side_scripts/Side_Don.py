@@ -1,8 +1,9 @@
 import pygame
 import math
-import colorsys
-
-pygame.init()
+import torus_engine
+import scene_state
+import render_thread
+import scene_manager
 
 # Screen and grid setup
 WIDTH, HEIGHT = 1280, 720
@@ -12,7 +13,7 @@ rows = HEIGHT // y_separator
 screen_size = rows * columns
 x_offset = columns / 2
 y_offset = rows / 2
-font = pygame.font.Font("NK57 Monospace Cd Bd.otf", 20)
+font = None  # from the shared font cache on first use
 
 # Torus configuration
 R1, R2 = 1.1, 2.5
@@ -45,185 +46,181 @@ MID_COLOR = (180, 180, 200)
 HIGHLIGHT_COLOR = (220, 240, 255)
 
 # Utility functions
-def normalize(v):
-    l = math.sqrt(sum(i * i for i in v))
-    return [i / l for i in v] if l != 0 else v
-
-def dot(a, b):
-    return sum(i * j for i, j in zip(a, b))
-
-def lerp_color(c1, c2, t):
-    return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
-
-def project_point(px, py, pz):
-    z = pz + 5
-    ooz = 1 / z
-    zoom_scale = zoom_scales[zoom_level]
-    xp = int(x_offset + 80 * ooz * px * zoom_scale)
-    yp = int(y_offset + 40 * ooz * py * zoom_scale)
-    return xp, yp, ooz
-
 def rotate_surface(surface, angle, center):
     """Rotate a surface around its center"""
     rotated = pygame.transform.rotate(surface, math.degrees(angle))
     new_rect = rotated.get_rect(center=center)
     return rotated, new_rect
 
-# Init screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Donut with Axis/Plane Control")
-clock = pygame.time.Clock()
-run = True
-
-while run:
-    screen.fill((0, 0, 0))
-    zbuffer = [0.0] * screen_size
-    colorbuffer = [(0, 0, 0, 0)] * screen_size
-
-    if dragging and last_mouse_pos:
-        mx, my = pygame.mouse.get_pos()
-        dx, dy = mx - last_mouse_pos[0], my - last_mouse_pos[1]
-        last_mouse_pos = (mx, my)
-        if 'X' in active_axes: A += dy * sensitivity
-        if 'Y' in active_axes: B += dx * sensitivity
-        if 'Z' in active_axes: C += dx * sensitivity
-
-    if auto_rotate:
-        if 'X' in active_axes: A += 0.3
-        if 'Y' in active_axes: B += 0.3
-        if 'Z' in active_axes: C += 0.3
-        # Spin the R text when auto-rotate is on
-        r_rotation_angle += 0.08  # Adjust speed as needed
-
-    for theta_deg in range(0, 360, theta_spacing):
-        theta = math.radians(theta_deg)
-        cost, sint = math.cos(theta), math.sin(theta)
-        for phi_deg in range(0, 360, phi_spacing):
-            phi = math.radians(phi_deg)
-            cosp, sinp = math.cos(phi), math.sin(phi)
-            circlex = R2 + R1 * cost
-            circley = R1 * sint
-            x = circlex * (math.cos(B) * cosp + math.sin(A) * math.sin(B) * sinp) - circley * math.cos(A) * math.sin(B)
-            y = circlex * (math.sin(B) * cosp - math.sin(A) * math.cos(B) * sinp) + circley * math.cos(A) * math.cos(B)
-            z = circlex * math.cos(A) * sinp + circley * math.sin(A)
-            x_rot = x * math.cos(C) - y * math.sin(C)
-            y_rot = x * math.sin(C) + y * math.cos(C)
-            x, y = x_rot, y_rot
-            xp, yp, ooz = project_point(x, y, z)
-            idx = xp + columns * yp
-            if 0 <= xp < columns and 0 <= yp < rows:
-                nx = cost * cosp
-                ny = cost * sinp
-                nz = sint
-                norm = normalize([nx, ny, nz])
-                lum = dot(norm, normalize(light))
-                lum = max(0, min(1, lum))
-                if ooz > zbuffer[idx]:
-                    zbuffer[idx] = ooz
-                    base = lerp_color(SHADOW_COLOR, MID_COLOR, lum * 2) if lum < 0.5 else lerp_color(MID_COLOR, HIGHLIGHT_COLOR, (lum - 0.5) * 2)
-                    shade = 0.7 + 0.6 * ooz
-                    shaded = tuple(min(255, int(c * shade)) for c in base)
-                    r, g, b = [c / 255 for c in shaded]
-                    h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                    h = (h + hue) % 1.0
-                    final_color = tuple(int(c * 255) for c in colorsys.hsv_to_rgb(h, s, v))
-                    alpha = 100 if transparent_mode else 255
-                    colorbuffer[idx] = (*final_color, alpha)
-
-    donut_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    x_pos = y_pos = 0
-    radius = min(x_separator, y_separator) // 2
-    for i in range(screen_size):
-        if colorbuffer[i][3] > 0:
-            center = (x_pos + x_separator // 2, y_pos + y_separator // 2)
-            pygame.draw.circle(donut_surface, colorbuffer[i], center, radius)
-        if (i + 1) % columns == 0:
-            x_pos = 0
-            y_pos += y_separator
+def render_frame(buffers, snapshot):
+    """Render worker: one torus frame for an (A, B, C, zoom, hue) snapshot"""
+    A, B, C, zoom, hue = snapshot
+    geometry = torus_engine.get_geometry(R1, R2, theta_spacing, phi_spacing)
+    torus_engine.render_torus(
+        geometry, A, B, C, buffers, light,
+        (SHADOW_COLOR, MID_COLOR, HIGHLIGHT_COLOR),
+        hue=hue, zoom=zoom)
+
+def run_donut(sink=None):
+    """Interactive window, or render the frames of an offscreen.FrameSink schedule"""
+    global A, B, C, active_axes, auto_rotate, dragging, last_mouse_pos, hue, transparent_mode, zoom_level
+    global r_rotation_angle
+    global columns, rows, screen_size, x_offset, y_offset, font
+
+    scene_manager.init()
+    font = scene_manager.get_font(scene_manager.FONT_PATH, 20)
+    # Grid follows the current screen/separator settings; the two depth/color
+    # grids of the render pipeline and the dot surface are allocated once
+    columns, rows = WIDTH // x_separator, HEIGHT // y_separator
+    screen_size = rows * columns
+    x_offset, y_offset = columns / 2, rows / 2
+    pipeline = render_thread.RenderPipeline(render_frame, columns, rows)
+    presenter = torus_engine.DotPresenter(columns, rows, x_separator, y_separator, min(x_separator, y_separator) // 2)
+
+    # Init screen
+    if sink is None:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Donut with Axis/Plane Control")
+    else:
+        screen = sink.open((WIDTH, HEIGHT))
+    clock = pygame.time.Clock()
+    scene = scene_state.SceneState()
+    run = True
+
+    while run:
+        if sink is not None:
+            A, B, C = sink.angles
+
+        if dragging and last_mouse_pos:
+            mx, my = pygame.mouse.get_pos()
+            dx, dy = mx - last_mouse_pos[0], my - last_mouse_pos[1]
+            last_mouse_pos = (mx, my)
+            if 'X' in active_axes: A += dy * sensitivity
+            if 'Y' in active_axes: B += dx * sensitivity
+            if 'Z' in active_axes: C += dx * sensitivity
+
+        if auto_rotate:
+            if 'X' in active_axes: A += 0.3
+            if 'Y' in active_axes: B += 0.3
+            if 'Z' in active_axes: C += 0.3
+            # Spin the R text when auto-rotate is on
+            r_rotation_angle += 0.08  # Adjust speed as needed
+
+        # The worker renders the torus for this state while this thread shows
+        # the last finished frame and keeps handling input
+        changed = sink is not None or scene.dirty(A, B, C, zoom_level, transparent_mode, auto_rotate,
+                                                  frozenset(active_axes), r_rotation_angle, hue=hue)
+        if changed:
+            pipeline.submit((A, B, C, zoom_scales[zoom_level], hue))
+
+        # Nothing on screen changed: keep the last frame up and sleep until input
+        # or the next visible hue step
+        if not changed and not pipeline.pending:
+            events = scene.wait(scene.hue_timeout(hue))
+            clock.tick(60)
         else:
-            x_pos += x_separator
-
-    screen.blit(donut_surface, (0, 0))
-
-    axes_display = ''.join(sorted(a.lower() for a in active_axes)) or "none"
-    axis_text = font.render(f"Axes: {axes_display}", True, (255, 255, 255))
-    zoom_text = font.render(f"Zoom: {zoom_scales[zoom_level]:.1f}x", True, (255, 255, 255))
-
-    # Create the Auto Rotate text with spinning R
-    if auto_rotate:
-        # Create separate text surfaces for "Auto " and "otate: ON"
-        auto_text = font.render("Auto ", True, (255, 255, 255))
-        otate_text = font.render("otate: ON", True, (255, 255, 255))
+            screen.fill((0, 0, 0))
+            buffers = pipeline.acquire(block=sink is not None)
+            alpha = 100 if transparent_mode else 255
+            donut_surface = presenter.present(buffers, alpha)
+
+            screen.blit(donut_surface, (0, 0))
+
+            axes_display = ''.join(sorted(a.lower() for a in active_axes)) or "none"
+            axis_text = font.render(f"Axes: {axes_display}", True, (255, 255, 255))
+            zoom_text = font.render(f"Zoom: {zoom_scales[zoom_level]:.1f}x", True, (255, 255, 255))
+            stats = pipeline.stats()
+            pipeline_text = font.render(f"Frames: {stats['dropped']} dropped, queue {stats['queue_depth']:.1f}",
+                                        True, (255, 255, 255))
+
+            # Create the Auto Rotate text with spinning R
+            if auto_rotate:
+                # Create separate text surfaces for "Auto " and "otate: ON"
+                auto_text = font.render("Auto ", True, (255, 255, 255))
+                otate_text = font.render("otate: ON", True, (255, 255, 255))
         
-        # Create the spinning R
-        r_text = font.render("R", True, (255, 100, 100))  # Red color for emphasis
-        r_rotated, r_rect = rotate_surface(r_text, r_rotation_angle, (0, 0))
+                # Create the spinning R
+                r_text = font.render("R", True, (255, 100, 100))  # Red color for emphasis
+                r_rotated, r_rect = rotate_surface(r_text, r_rotation_angle, (0, 0))
         
-        # Position everything
-        auto_width = auto_text.get_width()
-        r_width = r_text.get_width()
+                # Position everything
+                auto_width = auto_text.get_width()
+                r_width = r_text.get_width()
         
-        # Blit the text components
-        screen.blit(auto_text, (10, 35))
+                # Blit the text components
+                screen.blit(auto_text, (10, 35))
         
-        # Position the spinning R after "Auto "
-        r_center = (10 + auto_width + r_width // 2, 35 + r_text.get_height() // 2)
-        r_rect.center = r_center
-        screen.blit(r_rotated, r_rect)
+                # Position the spinning R after "Auto "
+                r_center = (10 + auto_width + r_width // 2, 35 + r_text.get_height() // 2)
+                r_rect.center = r_center
+                screen.blit(r_rotated, r_rect)
         
-        # Position "otate: ON" after the spinning R
-        otate_x = 10 + auto_width + r_width
-        screen.blit(otate_text, (otate_x, 35))
-    else:
-        # Normal static text when not rotating
-        rotate_text = font.render("Auto Rotate: OFF", True, (255, 255, 255))
-        screen.blit(rotate_text, (10, 35))
-
-    help_lines = [
-        "Help",
-        "Auto Rotate: press R",
-        "Reset Position: press E",
-        "Transparency Toggle: press T",
-        "Zoom: press 7",
-        "For X-axis: press X",
-        "For Y-axis: press Y",
-        "For Z-axis: press Z",
-    ]
-
-    screen.blit(axis_text, (10, 10))
-    screen.blit(zoom_text, (10, 60))
-    for i, line in enumerate(help_lines):
-        text = font.render(line, True, (180, 180, 180))
-        screen.blit(text, (10, 95 + i * 25))
-
-    pygame.display.flip()
-    hue += 0.004
-    clock.tick(60)
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-            run = False
-        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            dragging = True
-            last_mouse_pos = pygame.mouse.get_pos()
-        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
-            dragging = False
-            last_mouse_pos = None
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_r:
-                auto_rotate = not auto_rotate
-                # Reset R rotation when toggling
-                if not auto_rotate:
-                    r_rotation_angle = 0.0
-            elif event.key == pygame.K_e:
-                A, B, C = 0.0, 0.0, 0.0
-            elif event.key == pygame.K_t:
-                transparent_mode = not transparent_mode
-            elif event.key == pygame.K_7:
-                zoom_level = (zoom_level + 1) % 4  # Cycle through 0, 1, 2, 3
-            elif event.key == pygame.K_x:
-                active_axes ^= {'X'}
-            elif event.key == pygame.K_y:
-                active_axes ^= {'Y'}
-            elif event.key == pygame.K_z:
-                active_axes ^= {'Z'}
\ No newline at end of file
+                # Position "otate: ON" after the spinning R
+                otate_x = 10 + auto_width + r_width
+                screen.blit(otate_text, (otate_x, 35))
+            else:
+                # Normal static text when not rotating
+                rotate_text = font.render("Auto Rotate: OFF", True, (255, 255, 255))
+                screen.blit(rotate_text, (10, 35))
+
+            help_lines = [
+                "Help",
+                "Auto Rotate: press R",
+                "Reset Position: press E",
+                "Transparency Toggle: press T",
+                "Zoom: press 7",
+                "For X-axis: press X",
+                "For Y-axis: press Y",
+                "For Z-axis: press Z",
+            ]
+
+            screen.blit(axis_text, (10, 10))
+            screen.blit(zoom_text, (10, 60))
+            screen.blit(pipeline_text, (10, 85))
+            for i, line in enumerate(help_lines):
+                text = font.render(line, True, (180, 180, 180))
+                screen.blit(text, (10, 120 + i * 25))
+
+            if sink is not None:
+                hue += 0.004
+                sink.add()
+                if sink.done:
+                    pipeline.close()
+                    return sink.frames
+                continue  # offscreen: no frame pacing or events
+            pygame.display.flip()
+            clock.tick(60)
+            events = pygame.event.get()
+        hue += scene_state.HUE_RATE * clock.get_time()
+
+        for event in events:
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                run = False
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                dragging = True
+                last_mouse_pos = pygame.mouse.get_pos()
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                dragging = False
+                last_mouse_pos = None
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:
+                    auto_rotate = not auto_rotate
+                    # Reset R rotation when toggling
+                    if not auto_rotate:
+                        r_rotation_angle = 0.0
+                elif event.key == pygame.K_e:
+                    A, B, C = 0.0, 0.0, 0.0
+                elif event.key == pygame.K_t:
+                    transparent_mode = not transparent_mode
+                elif event.key == pygame.K_7:
+                    zoom_level = (zoom_level + 1) % 4  # Cycle through 0, 1, 2, 3
+                elif event.key == pygame.K_x:
+                    active_axes ^= {'X'}
+                elif event.key == pygame.K_y:
+                    active_axes ^= {'Y'}
+                elif event.key == pygame.K_z:
+                    active_axes ^= {'Z'}
+    pipeline.close()
+
+if __name__ == "__main__":
+    run_donut()
@@ -1,31 +1,41 @@
 import pygame
-import math
-import colorsys
-import random
-
-def run_donut():
-    pygame.init()
-    WIDTH, HEIGHT = 1280, 720
-    x_separator, y_separator = 2, 4
+import torus_engine
+import frame_profiler
+import lod
+import parallel_render
+import frame_archive
+import scene_manager
+
+# Frames in a kiosk replay (--archive PATH); the spin is rounded to close the loop
+ARCHIVE_FRAMES = 500
+
+def run_donut(sink=None, size=(1280, 720), separators=(2, 4), spacing=(2, 2), ascii_mode=True, workers=0,
+              archive=None):
+    """Interactive window, or render the frames of an offscreen.FrameSink schedule
+
+    With `workers` > 1 the torus is rendered by that many processes, each taking
+    a share of the theta rings. `archive` names a frame_archive that replays the
+    startup spin in dot mode until a setting changes, then the spin goes on live.
+    """
+    scene_manager.init()
+    WIDTH, HEIGHT = size
+    x_separator, y_separator = separators
     columns = WIDTH // x_separator
     rows = HEIGHT // y_separator
-    x_offset = columns / 2
-    y_offset = rows / 2
 
     A, B = 0, 0
-    theta_spacing = 2
-    phi_spacing = 2
+    theta_spacing, phi_spacing = spacing
     R1, R2 = 1.1, 2.5
 
     zoom_factor = 1.5
     spin_speed = 5.0
     freeze = False
-    ascii_mode = True
     theme_index = 3
     light_directions = [[0, 1, -1], [1, 1, -1], [0, -1, -1], [1, 0, -1]]
     light_dir_index = 0
 
     CHARACTERS = list("RAM")
+    char_mode_index = 0
     font = pygame.font.SysFont('Consolas', 14, bold=True)
 
     # THEMES: Each theme has 2 palettes (Base + Accent)
@@ -74,121 +84,140 @@ def run_donut():
         "Amethyst Fade"
     ]
 
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("3D Multicolored Donut Visualizer")
-
-    def normalize(v):
-        l = math.sqrt(sum(i*i for i in v))
-        return [i / l for i in v]
-
-    def dot(a, b):
-        return sum(i * j for i, j in zip(a, b))
-
-    def lerp_color(c1, c2, t):
-        return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
+    if sink is None:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("3D Multicolored Donut Visualizer")
+    else:
+        screen = sink.open((WIDTH, HEIGHT))
+
+    geometry = torus_engine.get_geometry(R1, R2, theta_spacing, phi_spacing)
+    buffers = torus_engine.FrameBuffers(columns, rows)
+    presenter = torus_engine.DotPresenter(columns, rows, x_separator, y_separator, 1)
+    torus_engine.prepare_lights(geometry, light_directions)
+    parallel = parallel_render.ParallelRenderer(columns, rows, workers) if workers > 1 else None
+    render = parallel.render if parallel is not None else torus_engine.render_torus
+
+    # Adaptive sample density for a 60 fps target, toggled with O
+    detail = lod.LODController(target_fps=60)
+    clock = pygame.time.Clock()
+
+    # Per-stage profiler, toggled with P; the trace is written when it stops
+    profiler = frame_profiler.FrameProfiler()
+    trace_path = "frame_trace.json"
+
+    replay = None
+    if archive is not None and sink is None and not ascii_mode:  # the archive only holds dot colors
+        def replay_state():
+            return (theme_index, light_dir_index, zoom_factor, spin_speed, freeze, ascii_mode, char_mode_index,
+                    detail.enabled)
+
+        archive_state = replay_state()
+        a_step = frame_archive.closed_step(0.02 * spin_speed, ARCHIVE_FRAMES)
+        b_step = frame_archive.closed_step(0.01 * spin_speed, ARCHIVE_FRAMES)
+
+        def render_archive_frame(frame_buffers, index):
+            palette1, palette2 = themes[theme_index]
+            torus_engine.render_torus(
+                geometry, index * a_step, index * b_step, 0.0, frame_buffers, light_directions[light_dir_index],
+                palette1, zoom=zoom_factor, low_gain=1, depth_base=0.8, depth_gain=0.7, accent=palette2)
+
+        params = {"scene": "animate", "R1": R1, "R2": R2, "separators": [x_separator, y_separator],
+                  "spacing": [theta_spacing, phi_spacing], "light": light_directions[light_dir_index],
+                  "zoom": zoom_factor, "theme": themes[theme_index], "steps": [a_step, b_step]}
+        replay = frame_archive.load_or_record(archive, params, columns, rows, ARCHIVE_FRAMES, render_archive_frame)
+        replay_frame = 0
 
     run = True
     display_panel_open = False
 
     while run:
+        if sink is not None:
+            A, B, _ = sink.angles  # this donut never rolls
         screen.fill((10, 10, 10))
 
         # Theme palettes
         palette1, palette2 = themes[theme_index]
         light = light_directions[light_dir_index]
 
-        pygame.draw.rect(screen, (0, 0, 0), (0, 0, 260, HEIGHT))
-        ui_texts = [
-            "Display (D)  [Toggle]",
-            "ESC: EXIT"
-        ]
-
-        if display_panel_open:
-            ui_texts += [
-                f"THEME (T): {theme_names[theme_index]}",
-                f"SPEED (UP/DOWN): {spin_speed:.2f}",
-                f"ZOOM (Z/X): {zoom_factor:.2f}",
-                f"RESET (R)",
-                f"LIGHT (L): {light_directions[light_dir_index]}",
-                f"ASCII (A): {'ON' if ascii_mode else 'OFF'}",
-                f"FREEZE (F): {'ON' if freeze else 'OFF'}"
+        with profiler.stage("hud"):
+            pygame.draw.rect(screen, (0, 0, 0), (0, 0, 260, HEIGHT))
+            ui_texts = [
+                "Display (D)  [Toggle]",
+                "ESC: EXIT"
             ]
 
-        y_offset_ui = 20
-        for text in ui_texts:
-            rendered = font.render(text, True, (200, 200, 200))
-            screen.blit(rendered, (20, y_offset_ui))
-            y_offset_ui += 25
-
-        zbuffer = [0.0] * (rows * columns)
-        colorbuffer = [(0, 0, 0)] * (rows * columns)
-        charbuffer = [' '] * (rows * columns)
-
-        for theta_deg in range(0, 360, theta_spacing):
-            theta = math.radians(theta_deg)
-            cost, sint = math.cos(theta), math.sin(theta)
-            for phi_deg in range(0, 360, phi_spacing):
-                phi = math.radians(phi_deg)
-                cosp, sinp = math.cos(phi), math.sin(phi)
-
-                circlex = R2 + R1 * cost
-                circley = R1 * sint
-
-                x = circlex * (math.cos(B) * cosp + math.sin(A) * math.sin(B) * sinp) - circley * math.cos(A) * math.sin(B)
-                y = circlex * (math.sin(B) * cosp - math.sin(A) * math.cos(B) * sinp) + circley * math.cos(A) * math.cos(B)
-                z = 5 + circlex * math.cos(A) * sinp + circley * math.sin(A)
-
-                ooz = 1 / z
-                xp = int(x_offset + zoom_factor * 80 * ooz * x)
-                yp = int(y_offset + zoom_factor * 40 * ooz * y)
-                idx = xp + columns * yp
-
-                nx, ny, nz = cost * cosp, cost * sinp, sint
-                norm = normalize([nx, ny, nz])
-                lum = max(0, min(1, dot(norm, normalize(light))))
-
-                # Blending between palettes based on phi
-                blend_factor = (math.sin(phi) + 1) / 2  # Smooth wave between 0 and 1
-
-                # Blend each palette color
-                shadow_color = lerp_color(palette1[0], palette2[0], blend_factor)
-                mid_color    = lerp_color(palette1[1], palette2[1], blend_factor)
-                highlight_color = lerp_color(palette1[2], palette2[2], blend_factor)
-
-                if 0 <= xp < columns and 0 <= yp < rows and ooz > zbuffer[idx]:
-                    zbuffer[idx] = ooz
-                    base = lerp_color(shadow_color, mid_color, lum) if lum < 0.5 else lerp_color(mid_color, highlight_color, (lum - 0.5) * 2)
-                    depth_shade = 0.8 + 0.7 * ooz
-                    shaded = tuple(min(255, int(c * depth_shade)) for c in base)
-                    colorbuffer[idx] = shaded
-                    charbuffer[idx] = random.choice(CHARACTERS)
-
-        x_pos = y_pos = 0
-        for i in range(rows * columns):
-            if colorbuffer[i] != (0, 0, 0):
-                color = colorbuffer[i]
-                if ascii_mode:
-                    char = charbuffer[i]
-                    text_surface = font.render(char, True, color)
-                    center = (x_pos + x_separator // 2, y_pos + y_separator // 2)
-                    screen.blit(text_surface, center)
-                else:
-                    center = (x_pos + x_separator // 2, y_pos + y_separator // 2)
-                    pygame.draw.circle(screen, color, center, 1)
-
-            if (i + 1) % columns == 0:
-                x_pos = 0
-                y_pos += y_separator
+            if display_panel_open:
+                ui_texts += [
+                    f"THEME (T): {theme_names[theme_index]}",
+                    f"SPEED (UP/DOWN): {spin_speed:.2f}",
+                    f"ZOOM (Z/X): {zoom_factor:.2f}",
+                    f"RESET (R)",
+                    f"LIGHT (L): {light_directions[light_dir_index]}",
+                    f"ASCII (A): {'ON' if ascii_mode else 'OFF'}",
+                    f"CHARS (C): {torus_engine.CHARACTER_MODES[char_mode_index].upper()}",
+                    f"FREEZE (F): {'ON' if freeze else 'OFF'}",
+                    f"PROFILER (P): {'ON' if profiler.enabled else 'OFF'}",
+                    f"LOD (O): {detail.label()}"
+                ]
+
+            y_offset_ui = 20
+            for text in ui_texts:
+                rendered = font.render(text, True, (200, 200, 200))
+                screen.blit(rendered, (20, y_offset_ui))
+                y_offset_ui += 25
+
+        if replay is not None and replay_state() != archive_state:
+            # Left the recorded spin: carry on live from the frame on screen
+            index = max(replay_frame - 1, 0)
+            A, B = index * a_step, index * b_step
+            replay = None
+        replaying = replay is not None
+        if not replaying:
+            with profiler.stage("geometry"):
+                geometry = torus_engine.get_geometry(R1, R2, theta_spacing, phi_spacing)
+
+            # Blending between palettes follows phi, a smooth wave between 0 and 1
+            cells, colors = render(
+                geometry, A, B, 0.0, buffers, light, palette1,
+                zoom=zoom_factor, low_gain=1, depth_base=0.8, depth_gain=0.7, accent=palette2,
+                profiler=profiler)
+
+        with profiler.stage("present"):
+            if replaying:
+                screen.blit(presenter.present_colors(replay.frame(replay_frame)), (0, 0))
+                replay_frame += 1
+            elif ascii_mode:
+                atlas = torus_engine.get_glyph_atlas(font, CHARACTERS)
+                char_indices = torus_engine.assign_characters(
+                    torus_engine.CHARACTER_MODES[char_mode_index], len(CHARACTERS), buffers, geometry, light)
+                atlas.draw(screen, cells, colors, char_indices, columns, x_separator, y_separator)
             else:
-                x_pos += x_separator
-
-        pygame.display.flip()
-
-        if not freeze:
+                screen.blit(presenter.present(buffers), (0, 0))
+
+        if profiler.enabled:
+            profiler.draw_overlay(screen, font, WIDTH - 280, 20)
+
+        if sink is not None:
+            profiler.end_frame()
+            sink.add()
+            if sink.done:
+                if parallel is not None:
+                    parallel.close()
+                return sink.frames
+            continue  # offscreen: no events
+        with profiler.stage("flip"):
+            pygame.display.flip()
+        clock.tick()
+        theta_spacing, phi_spacing = detail.update(clock.get_rawtime(), zoom_factor)
+
+        if not freeze and not replaying:
             A += 0.02 * spin_speed
             B += 0.01 * spin_speed
 
-        for event in pygame.event.get():
+        with profiler.stage("events"):
+            events = pygame.event.get()
+        profiler.end_frame()
+        for event in events:
             if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
                 run = False
 
@@ -208,16 +237,35 @@ def run_donut():
                         spin_speed = 5.0
                         zoom_factor = 1.5
                         freeze = False
+                        detail.reset()
                     if event.key == pygame.K_z:
                         zoom_factor += 0.1
                     if event.key == pygame.K_x:
                         zoom_factor = max(0.1, zoom_factor - 0.1)
                     if event.key == pygame.K_a:
                         ascii_mode = not ascii_mode
+                    if event.key == pygame.K_c:
+                        char_mode_index = (char_mode_index + 1) % len(torus_engine.CHARACTER_MODES)
                     if event.key == pygame.K_l:
                         light_dir_index = (light_dir_index + 1) % len(light_directions)
                     if event.key == pygame.K_f:
                         freeze = not freeze
+                    if event.key == pygame.K_o:
+                        detail.enabled = not detail.enabled
+                    if event.key == pygame.K_p:
+                        if not profiler.toggle():
+                            profiler.export_trace(trace_path)
+
+    if profiler.enabled:
+        profiler.export_trace(trace_path)
+    if parallel is not None:
+        parallel.close()
 
 if __name__ == "__main__":
-    run_donut()
+    import sys
+
+    # usage: python animate.py [--workers N] [--archive PATH]; the archive replays in dot mode
+    args = sys.argv[1:]
+    archive = args[args.index("--archive") + 1] if "--archive" in args else None
+    run_donut(workers=int(args[args.index("--workers") + 1]) if "--workers" in args else 0,
+              archive=archive, ascii_mode=archive is None)
@@ -0,0 +1,236 @@
+import importlib
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pygame
+import offscreen
+import parallel_render
+import torus_engine
+
+# Headless frame-rate benchmark for every donut renderer.
+# usage: python benchmark.py [--quick] [--cull] [--scaling [N]] [--frames N] [--only name,name] [--out results.json]
+
+# main.py lives one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Sweep matrix
+RESOLUTIONS = [(640, 360), (1280, 720)]
+SEPARATORS = [(2, 4), (3, 6)]
+SPACINGS = [(2, 2), (4, 4)]
+
+FRAMES = 40  # timed frames per run
+WARMUP = 5  # frames rendered before timing starts (caches, LUTs, glyphs)
+MEMORY_FRAMES = 5  # frames rendered under tracemalloc for the peak-memory figure
+STEP = (0.02, 0.01, 0.005)  # per-frame (A, B, C) advance, the same for every run
+
+# Multi-process scaling case: animate.py's 640x180 grid at the finest spacing
+SCALING_CASE = ((1280, 720), (2, 4), (1, 1))
+SCALING_PALETTES = ([(30, 30, 30), (180, 180, 180), (255, 255, 255)],
+                    [(80, 80, 80), (200, 200, 200), (255, 255, 255)])
+
+
+def _module_scene(name, planes=None):
+    """Scripts keeping their settings in module globals (DonW, Side_Don, Side_Don2)"""
+    def run(sink, size, separators, spacing):
+        module = importlib.import_module(name)
+        module.WIDTH, module.HEIGHT = size
+        module.x_separator, module.y_separator = separators
+        module.theta_spacing, module.phi_spacing = spacing
+        if planes is not None:
+            module.active_planes = set(planes)
+        module.run_donut(sink)
+    return run
+
+
+def _function_scene(name, **options):
+    """Scripts taking their settings as run_donut arguments (Donut, side3, animate)"""
+    def run(sink, size, separators, spacing):
+        module = importlib.import_module(name)
+        module.run_donut(sink, size=size, separators=separators, spacing=spacing, **options)
+    return run
+
+
+def _main_background(sink, size, separators, spacing):
+    """The launcher's background donut rendered live, one loop frame per scheduled frame
+
+    The ring is not baked here: its worker would compete with the timed frames.
+    """
+    import main
+    main.WIDTH, main.HEIGHT = size
+    main.DONUT_XSEP, main.DONUT_YSEP = separators
+    main.DONUT_THETA_SPACING, main.DONUT_PHI_SPACING = spacing
+    main.init_donut_bg(bake=False)
+    surface = sink.open(size)
+    while not sink.done:
+        surface.fill(main.BG_COLOR)
+        main.render_donut_frame(main.donut_buffers, sink.count)
+        surface.blit(main.donut_presenter.present(main.donut_buffers), (0, 0))
+        sink.add()
+
+
+RENDERERS = {
+    "main.draw_donut_bg": _main_background,
+    "DonW": _module_scene("DonW"),
+    "Side_Don": _module_scene("Side_Don"),
+    "Side_Don2": _module_scene("Side_Don2", planes=()),
+    "Side_Don2+planes": _module_scene("Side_Don2", planes=("X", "Y", "Z")),
+    "side3": _function_scene("side3"),
+    "Donut": _function_scene("Donut"),
+    "animate.ascii": _function_scene("animate", ascii_mode=True),
+    "animate.dots": _function_scene("animate", ascii_mode=False),
+}
+
+
+def samples_per_frame(spacing):
+    """Torus samples the renderers transform every frame"""
+    return len(range(0, 360, spacing[0])) * len(range(0, 360, spacing[1]))
+
+
+def run_case(name, size, separators, spacing, frames=FRAMES, warmup=WARMUP):
+    """Peak memory from a cold start, then timed frames after a warmup"""
+    render = RENDERERS[name]
+    torus_engine.clear_caches()
+
+    tracemalloc.start()
+    render(offscreen.FrameSink(offscreen.spin_schedule(MEMORY_FRAMES, STEP), keep=False), size, separators, spacing)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    sink = offscreen.FrameSink(offscreen.spin_schedule(warmup + frames, STEP), keep=False)
+    torus_engine.reset_counters()
+    render(sink, size, separators, spacing)
+    times = np.array(sink.frame_times[warmup:]) * 1000
+    samples = samples_per_frame(spacing)
+    # Per render_torus call: samples projected and z-tested vs dropped as back-facing
+    counters = torus_engine.frame_counters
+    calls = counters["frames"] or 1
+    return {
+        "renderer": name,
+        "resolution": list(size),
+        "separators": list(separators),
+        "spacing": list(spacing),
+        "frames": len(times),
+        "ms_per_frame": {
+            "mean": float(times.mean()),
+            "min": float(times.min()),
+            "p50": float(np.percentile(times, 50)),
+            "p90": float(np.percentile(times, 90)),
+            "p99": float(np.percentile(times, 99)),
+            "max": float(times.max()),
+        },
+        "samples_per_frame": samples,
+        "samples_per_sec": samples / (times.mean() / 1000),
+        "samples_processed_per_frame": counters["samples"] / calls,
+        "samples_culled_per_frame": counters["culled"] / calls,
+        "peak_memory_mb": peak / 2 ** 20,
+    }
+
+
+def run_scaling(max_workers=None, frames=FRAMES, warmup=WARMUP, log=print):
+    """Frame time of parallel_render.ParallelRenderer from 1 to `max_workers` processes
+
+    Speedup and efficiency are relative to one worker process; the in-process
+    render_torus time shows the cost of the process hand-off itself.
+    """
+    size, separators, spacing = SCALING_CASE
+    columns, rows = size[0] // separators[0], size[1] // separators[1]
+    max_workers = max_workers or os.cpu_count() or 1
+    geometry = torus_engine.get_geometry(1.1, 2.5, *spacing)
+    palette, accent = SCALING_PALETTES
+    schedule = offscreen.spin_schedule(warmup + frames, STEP)
+
+    def time_frames(render):
+        buffers = torus_engine.FrameBuffers(columns, rows)
+        times = []
+        for i, angles in enumerate(schedule):
+            start = time.perf_counter()
+            render(geometry, *angles, buffers, [0, 1, -1], palette, zoom=1.5, low_gain=1,
+                   depth_base=0.8, depth_gain=0.7, accent=accent)
+            if i >= warmup:
+                times.append((time.perf_counter() - start) * 1000)
+        return float(np.percentile(times, 50))
+
+    in_process = time_frames(torus_engine.render_torus)
+    counts = sorted({1, max_workers, *(2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers)})
+    runs = []
+    for workers in counts:
+        renderer = parallel_render.ParallelRenderer(columns, rows, workers)
+        try:
+            ms = time_frames(renderer.render)
+        finally:
+            renderer.close()
+        speedup = runs[0]["ms_per_frame"] / ms if runs else 1.0
+        runs.append({"workers": workers, "ms_per_frame": ms, "speedup": speedup, "efficiency": speedup / workers})
+        if log:
+            log(f"{workers:2d} workers: p50 {ms:6.1f} ms  speedup {speedup:4.2f}x  efficiency {speedup / workers:4.0%}")
+    return {
+        "resolution": list(size),
+        "separators": list(separators),
+        "spacing": list(spacing),
+        "samples_per_frame": samples_per_frame(spacing),
+        "cpu_count": os.cpu_count(),
+        "in_process_ms_per_frame": in_process,
+        "runs": runs,
+    }
+
+
+def run_benchmark(names=None, resolutions=RESOLUTIONS, separators=SEPARATORS, spacings=SPACINGS,
+                  frames=FRAMES, warmup=WARMUP, log=print):
+    """Every renderer over the whole sweep matrix, as one JSON-ready dict"""
+    offscreen.headless()
+    results = []
+    for name in names or RENDERERS:
+        for size, seps, spacing in itertools.product(resolutions, separators, spacings):
+            result = run_case(name, size, seps, spacing, frames, warmup)
+            results.append(result)
+            if log:
+                ms = result["ms_per_frame"]
+                log(f"{name:20s} {size[0]}x{size[1]} sep {seps[0]}x{seps[1]} spacing {spacing[0]}x{spacing[1]}: "
+                    f"p50 {ms['p50']:6.1f} ms  p99 {ms['p99']:6.1f} ms  "
+                    f"{result['samples_per_sec'] / 1e6:5.2f} M samples/s  {result['peak_memory_mb']:6.1f} MB  "
+                    f"processed {result['samples_processed_per_frame']:7.0f} culled {result['samples_culled_per_frame']:7.0f}")
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "settings": {"frames": frames, "warmup": warmup, "memory_frames": MEMORY_FRAMES, "step": list(STEP),
+                     "backface_culling": torus_engine.backface_culling},
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    names = None
+    frames, out = FRAMES, "benchmark.json"
+    resolutions, separators, spacings = RESOLUTIONS, SEPARATORS, SPACINGS
+    if "--quick" in args:
+        # One point of the matrix, for a fast sanity check
+        resolutions, separators, spacings = RESOLUTIONS[-1:], SEPARATORS[-1:], SPACINGS[:1]
+        frames = 15
+    if "--cull" in args:
+        torus_engine.backface_culling = True
+    if "--frames" in args:
+        frames = int(args[args.index("--frames") + 1])
+    if "--only" in args:
+        names = args[args.index("--only") + 1].split(",")
+    if "--out" in args:
+        out = args[args.index("--out") + 1]
+    report = run_benchmark(names, resolutions, separators, spacings, frames)
+    if "--scaling" in args:
+        position = args.index("--scaling") + 1
+        max_workers = int(args[position]) if position < len(args) and args[position].isdigit() else None
+        report["scaling"] = run_scaling(max_workers, frames)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} runs to {out}")
@@ -0,0 +1,94 @@
+import json
+import math
+import os
+import numpy as np
+import torus_engine
+
+# Frame archive for replaying the same spin: a one-page JSON header followed by
+# fixed-size RGB color grids, one per frame (black cells are empty, as for
+# DotPresenter.present_colors). Playback maps the file with numpy.memmap, so
+# opening costs the same for any length and frames are paged in when shown.
+
+MAGIC = b"DONUTARC"
+VERSION = 1
+HEADER_SIZE = 4096  # frames start page-aligned
+
+
+def _canonical(params):
+    return json.loads(json.dumps(params))
+
+
+def closed_step(step, frames, period=2 * math.pi):
+    """`step` rounded so that `frames` steps make whole periods and the replay loops seamlessly"""
+    return period * max(1, round(step * frames / period)) / frames
+
+
+class FrameArchive:
+    """Read-only, memory-mapped view of an archive file"""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+            raise ValueError(f"{path} is not a frame archive")
+        info = json.loads(header[len(MAGIC):].rstrip(b"\0"))
+        if info["version"] != VERSION:
+            raise ValueError(f"{path} is archive version {info['version']}, expected {VERSION}")
+        self.path = path
+        self.columns, self.rows, self.count = info["columns"], info["rows"], info["frames"]
+        self.params = info["params"]
+        self.frames = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_SIZE,
+                                shape=(self.count, self.columns * self.rows, 3))
+
+    def __len__(self):
+        return self.count
+
+    def matches(self, params, columns, rows, count):
+        """Whether the archive was rendered with `params` on the same grid and length"""
+        return ((self.columns, self.rows, self.count) == (columns, rows, count)
+                and self.params == _canonical(params))
+
+    def frame(self, index):
+        """Colors of frame `index`, wrapping around"""
+        return self.frames[index % self.count]
+
+
+def write(path, frames, count, columns, rows, params):
+    """Write `count` (cells, 3) color grids from `frames` as an archive at `path`"""
+    info = {"version": VERSION, "columns": columns, "rows": rows, "frames": count, "params": params}
+    header = MAGIC + json.dumps(info).encode()
+    if len(header) > HEADER_SIZE:
+        raise ValueError("archive parameters do not fit in the header")
+    # Write beside the target and rename, so readers never see half an archive
+    partial = path + ".partial"
+    with open(partial, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        for colors in frames:
+            file.write(np.ascontiguousarray(colors, dtype=np.uint8).tobytes())
+    os.replace(partial, path)
+
+
+def record(path, render, count, columns, rows, params):
+    """Render `count` frames with `render(buffers, index)` into an archive; needs no window"""
+    buffers = torus_engine.FrameBuffers(columns, rows)
+
+    def frames():
+        for index in range(count):
+            render(buffers, index)
+            yield buffers.color
+
+    write(path, frames(), count, columns, rows, params)
+
+
+def load_or_record(path, params, columns, rows, count, render):
+    """The archive at `path`, recorded first if it is missing or its parameters differ"""
+    try:
+        archive = FrameArchive(path)
+        if archive.matches(params, columns, rows, count):
+            return archive
+        print(f"{path}: render parameters changed, rebuilding")
+        del archive
+    except (OSError, ValueError, KeyError):
+        print(f"{path}: recording {count} frames")
+    record(path, render, count, columns, rows, params)
+    return FrameArchive(path)
@@ -0,0 +1,108 @@
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# Named-stage timings for the render loops: rolling per-stage times for an
+# on-screen overlay, plus Chrome trace-event export (chrome://tracing, Perfetto).
+
+_UNTIMED = nullcontext()
+
+
+def untimed(name):
+    """Shared no-op stand-in for FrameProfiler.stage, for renders run without a profiler"""
+    return _UNTIMED
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler.record(self.name, self.start, end)
+        return False
+
+
+class FrameProfiler:
+    """Times named stages of each frame; while disabled `stage` hands back a shared no-op"""
+
+    def __init__(self, window=60, max_events=200000):
+        self.enabled = False
+        self.window = window  # frames in the rolling averages
+        self.history = {}  # stage -> recent per-frame totals in ms, in first-seen order
+        self.events = deque(maxlen=max_events)  # (name, start, end) for the trace
+        self._frame = {}
+        self._frame_start = None
+        self._origin = time.perf_counter()
+
+    def toggle(self):
+        """Start a fresh recording, or stop the current one"""
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.history.clear()
+            self.events.clear()
+        self._frame.clear()
+        self._frame_start = None
+        return self.enabled
+
+    def stage(self, name):
+        """Context manager timing one phase of the current frame"""
+        if not self.enabled:
+            return _UNTIMED
+        return _Stage(self, name)
+
+    def record(self, name, start, end):
+        if self._frame_start is None:
+            self._frame_start = start
+        self._frame[name] = self._frame.get(name, 0.0) + (end - start) * 1000
+        self.events.append((name, start, end))
+
+    def end_frame(self):
+        """Close the current frame: push its stage totals into the rolling history"""
+        if not self.enabled or self._frame_start is None:
+            return
+        end = time.perf_counter()
+        self.events.append(("frame", self._frame_start, end))
+        self._frame["frame"] = (end - self._frame_start) * 1000
+        for name, ms in self._frame.items():
+            if name not in self.history:
+                self.history[name] = deque(maxlen=self.window)
+            self.history[name].append(ms)
+        self._frame.clear()
+        self._frame_start = None
+
+    def averages(self):
+        """Rolling mean ms per stage"""
+        return {name: sum(times) / len(times) for name, times in self.history.items() if times}
+
+    def draw_overlay(self, screen, font, x, y, color=(255, 220, 120), line_height=22):
+        """Per-stage rolling times, one line per stage"""
+        averages = self.averages()
+        frame = averages.pop("frame", 0.0)
+        lines = [f"Frame: {frame:.1f} ms ({1000 / frame if frame else 0:.0f} fps)"]
+        lines += [f"{name}: {ms:.2f} ms" for name, ms in averages.items()]
+        for i, line in enumerate(lines):
+            screen.blit(font.render(line, True, color), (x, y + i * line_height))
+
+    def export_trace(self, path):
+        """Write the recorded stages as Chrome trace-event JSON"""
+        events = [{
+            "name": name,
+            "cat": "frame" if name == "frame" else "stage",
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": 0,
+            "tid": 0,
+        } for name, start, end in self.events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
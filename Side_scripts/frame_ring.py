@@ -0,0 +1,79 @@
+import threading
+import time
+import numpy as np
+import torus_engine
+import frame_archive
+
+# Pre-baked animation loop for decorative backgrounds whose motion never changes:
+# a worker thread renders each frame of the loop once into a compact color grid,
+# after which playing it back is one DotPresenter stamp per frame.
+
+
+class FrameRing:
+    """`count` frames of a fixed loop, baked in order by a background thread
+
+    `render(buffers, index)` draws frame `index` into `buffers` on the worker.
+    When `path` is given the finished ring is saved there as a frame_archive
+    recording `params`; a later run with the same params and grid maps that
+    archive instead of baking. With `bake` False nothing is baked until `resume`.
+    """
+
+    def __init__(self, render, count, columns, rows, path=None, params=None, bake=True):
+        self.render = render
+        self.count = count
+        self.columns, self.rows = columns, rows
+        self.path, self.params = path, params
+        self.ready = 0  # frames baked so far; frames[:ready] are final
+        self.bake_ms = 0.0
+        self.loaded = False
+        self._running = False
+        self._thread = None
+        archive = self._open() if path is not None else None
+        if archive is not None:
+            self.frames = archive.frames
+            self.ready, self.loaded = count, True
+        else:
+            self.frames = np.zeros((count, columns * rows, 3), dtype=np.uint8)
+            self._buffers = torus_engine.FrameBuffers(columns, rows)
+            if bake:
+                self.resume()
+
+    def _open(self):
+        try:
+            archive = frame_archive.FrameArchive(self.path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return archive if archive.matches(self.params, self.columns, self.rows, self.count) else None
+
+    def _bake(self):
+        start = time.perf_counter()
+        try:
+            for index in range(self.ready, self.count):
+                if not self._running:
+                    return
+                self.render(self._buffers, index)
+                self.frames[index] = self._buffers.color
+                self.ready = index + 1
+        finally:
+            self.bake_ms += (time.perf_counter() - start) * 1000
+        if self.path is not None:
+            frame_archive.write(self.path, self.frames, self.count, self.columns, self.rows, self.params)
+
+    def frame(self, index):
+        """Colors of frame `index` (wrapping), or None while it is not baked yet"""
+        index %= self.count
+        return self.frames[index] if index < self.ready else None
+
+    def resume(self):
+        """Start baking, or continue after `close` from the first frame not baked yet"""
+        if self.ready >= self.count or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._bake, name="frame ring", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop baking after the current frame"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
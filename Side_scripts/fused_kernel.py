@@ -0,0 +1,189 @@
+import math
+import numpy as np
+import torus_engine
+import frame_profiler
+
+# Fused per-sample rasterizer: transform, project, z-test and shade in one loop
+# with no per-sample temporaries, using the original DonW arithmetic so frames
+# match reference_render pixel for pixel. numba compiles it when installed;
+# without numba the renderers keep using torus_engine.render_torus.
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+AVAILABLE = numba is not None
+
+def _jit(function):
+    return numba.njit(cache=True, nogil=True)(function) if numba is not None else function
+
+
+@_jit
+def _rgb_to_hsv(r, g, b):
+    # colorsys.rgb_to_hsv, step for step
+    maxc = max(r, g, b)
+    minc = min(r, g, b)
+    rangec = maxc - minc
+    v = maxc
+    if minc == maxc:
+        return 0.0, 0.0, v
+    s = rangec / maxc
+    rc = (maxc - r) / rangec
+    gc = (maxc - g) / rangec
+    bc = (maxc - b) / rangec
+    if r == maxc:
+        h = bc - gc
+    elif g == maxc:
+        h = 2.0 + rc - bc
+    else:
+        h = 4.0 + gc - rc
+    h = (h / 6.0) % 1.0
+    return h, s, v
+
+
+@_jit
+def _hsv_to_rgb(h, s, v):
+    # colorsys.hsv_to_rgb, step for step
+    if s == 0.0:
+        return v, v, v
+    i = int(h * 6.0)
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i % 6
+    if i == 0:
+        return v, t, p
+    if i == 1:
+        return q, v, p
+    if i == 2:
+        return p, v, t
+    if i == 3:
+        return p, q, v
+    if i == 4:
+        return t, p, v
+    return v, p, q
+
+
+@_jit
+def _rasterize(cost, sint, cosp, sinp, R1, R2, A, B, C, zoom, distance, columns, rows, depth, winner):
+    """Z-test every sample into `depth`, keeping the first nearest sample of each cell in `winner`"""
+    cA, sA, cB, sB, cC, sC = math.cos(A), math.sin(A), math.cos(B), math.sin(B), math.cos(C), math.sin(C)
+    x_offset, y_offset = columns / 2, rows / 2
+    offscreen = 0
+    for k in range(cost.shape[0]):
+        circlex = R2 + R1 * cost[k]
+        circley = R1 * sint[k]
+        x = circlex * (cB * cosp[k] + sA * sB * sinp[k]) - circley * cA * sB
+        y = circlex * (sB * cosp[k] - sA * cB * sinp[k]) + circley * cA * cB
+        z = circlex * cA * sinp[k] + circley * sA
+        x, y = x * cC - y * sC, x * sC + y * cC
+        ooz = 1 / (z + distance)
+        xp = int(x_offset + 80 * ooz * x * zoom)
+        yp = int(y_offset + 40 * ooz * y * zoom)
+        if 0 <= xp < columns and 0 <= yp < rows:
+            idx = xp + columns * yp
+            if ooz > depth[idx]:
+                depth[idx] = ooz
+                winner[idx] = k
+        else:
+            offscreen += 1
+    return offscreen
+
+
+@_jit
+def _shaded(palette, low, high, t, c, shade_factor):
+    # lerp_color then the depth shade, for channel c
+    base = int(palette[low, c] + (palette[high, c] - palette[low, c]) * t)
+    return min(255, int(base * shade_factor))
+
+
+@_jit
+def _shade(cells, winners, cost, sint, cosp, sinp, light, palette, hue, rotate_hue, depth, color):
+    """Original lerp_color / depth shade / colorsys hue shift for each covered cell"""
+    for j in range(cells.shape[0]):
+        idx, k = cells[j], winners[j]
+        nx, ny, nz = cost[k] * cosp[k], cost[k] * sinp[k], sint[k]
+        n = math.sqrt(nx * nx + ny * ny + nz * nz)
+        if n != 0:
+            nx, ny, nz = nx / n, ny / n, nz / n
+        lum = max(0.0, min(1.0, nx * light[0] + ny * light[1] + nz * light[2]))
+        if lum < 0.5:
+            low, high, t = 0, 1, lum * 2
+        else:
+            low, high, t = 1, 2, (lum - 0.5) * 2
+        shade_factor = 0.7 + 0.6 * depth[idx]
+        r = _shaded(palette, low, high, t, 0, shade_factor)
+        g = _shaded(palette, low, high, t, 1, shade_factor)
+        b = _shaded(palette, low, high, t, 2, shade_factor)
+        if rotate_hue:
+            h, s, v = _rgb_to_hsv(r / 255, g / 255, b / 255)
+            rf, gf, bf = _hsv_to_rgb((h + hue) % 1.0, s, v)
+            r, g, b = int(rf * 255), int(gf * 255), int(bf * 255)
+        color[idx, 0], color[idx, 1], color[idx, 2] = r, g, b
+
+
+def render_torus(geometry, A, B, C, buffers, light, palette, hue=None, zoom=1.0, distance=5, profiler=None):
+    """torus_engine.render_torus for DonW's options, computed by the fused kernel"""
+    stage = profiler.stage if profiler is not None else frame_profiler.untimed
+    with stage("kernel"):
+        buffers.clear()
+        winner = np.full(buffers.columns * buffers.rows, -1, dtype=np.int64)
+        offscreen = _rasterize(geometry.cost, geometry.sint, geometry.cosp, geometry.sinp, geometry.R1,
+                               geometry.R2, A, B, C, zoom, distance, buffers.columns, buffers.rows,
+                               buffers.depth, winner)
+        cells = np.flatnonzero(winner >= 0)
+        winners = winner[cells]
+        l = math.sqrt(sum(i * i for i in light))
+        unit_light = np.array([i / l for i in light] if l != 0 else light, dtype=np.float64)
+        _shade(cells, winners, geometry.cost, geometry.sint, geometry.cosp, geometry.sinp, unit_light,
+               np.asarray(palette[:3], dtype=np.int64), 0.0 if hue is None else hue, hue is not None,
+               buffers.depth, buffers.color)
+    buffers.cells, buffers.winners, buffers.ooz = cells, winners, buffers.depth[cells]
+    buffers.samples, buffers.offscreen, buffers.culled = geometry.size, offscreen, 0
+    buffers.occluded = geometry.size - offscreen - len(cells)
+    for key in ("samples", "offscreen", "occluded"):
+        torus_engine.frame_counters[key] += getattr(buffers, key)
+    torus_engine.frame_counters["frames"] += 1
+    return cells, buffers.color[cells]
+
+
+def select(fused):
+    """Renderer for the `fused` startup choice; the NumPy engine when numba is missing"""
+    if fused and not AVAILABLE:
+        print("numba is not installed, using the NumPy renderer")
+    return render_torus if fused and AVAILABLE else torus_engine.render_torus
+
+
+def parity(spacing=(2, 2), columns=1280 // 3, rows=720 // 6):
+    """Cells where the kernel differs from the original loop, per angle set"""
+    palette = ((30, 40, 80), (180, 180, 200), (220, 240, 255))
+    geometry = torus_engine.get_geometry(1.1, 2.5, *spacing)
+    buffers = torus_engine.FrameBuffers(columns, rows)
+    mismatches = []
+    for A, B, C, hue, zoom in [(0.0, 0.0, 0.0, 0.0, 1.0), (0.7, 1.3, 0.0, 0.25, 1.5), (2.1, 0.4, 0.9, 0.6, 2.5)]:
+        render_torus(geometry, A, B, C, buffers, [0, 1, -1], palette, hue=hue, zoom=zoom)
+        ref_z, ref_c = torus_engine.reference_render(1.1, 2.5, *spacing, A, B, C, columns, rows,
+                                                     [0, 1, -1], palette, hue, zoom)
+        mismatches.append(int(((buffers.depth != ref_z) | (buffers.color != ref_c).any(axis=1)).sum()))
+    return mismatches
+
+
+if __name__ == "__main__":
+    import time
+
+    # Pixel-exact parity with the reference loop; interpreted (slow) without numba
+    print(f"numba: {numba.__version__ if AVAILABLE else 'not installed'}")
+    print(f"mismatched cells per frame: {parity()}")
+    if not AVAILABLE:
+        raise SystemExit
+    geometry = torus_engine.get_geometry(1.1, 2.5, 1, 1)
+    buffers = torus_engine.FrameBuffers(1280 // 3, 720 // 6)
+    palette = ((30, 40, 80), (180, 180, 200), (220, 240, 255))
+    for name, render in [("numpy", torus_engine.render_torus), ("fused", render_torus)]:
+        render(geometry, 0.0, 0.0, 0.0, buffers, [0, 1, -1], palette, hue=0.1)
+        start = time.perf_counter()
+        for i in range(10):
+            render(geometry, 0.02 * i, 0.01 * i, 0.0, buffers, [0, 1, -1], palette, hue=0.1)
+        print(f"{name}: {(time.perf_counter() - start) / 10 * 1000:.1f} ms/frame at 1x1 spacing")
@@ -1,13 +1,13 @@
 # Import necessary libraries
 import pygame  # For graphics and display
-import math  # For mathematical functions
-import colorsys  # For color manipulation in HSV
-import random  # For selecting random characters
+import torus_engine  # Vectorized torus rasterizer
+import lod  # Adaptive detail
+import scene_manager  # Display and font startup
 
 # Function to start and run the donut animation
 def run_donut():
     # Initialize pygame
-    pygame.init()
+    scene_manager.init()
 
     # Set window size
     WIDTH, HEIGHT = 1280, 720
@@ -16,11 +16,6 @@ def run_donut():
     x_separator, y_separator = 2, 4  # Pixel gaps for ASCII plotting
     columns = WIDTH // x_separator
     rows = HEIGHT // y_separator
-    screen_size = rows * columns  # Total grid points
-
-    # Center offsets
-    x_offset = columns / 2
-    y_offset = rows / 2
 
     # Initialize rotation angles
     A, B = 0, 0
@@ -28,6 +23,8 @@ def run_donut():
     # Control detail level (lower = more detailed)
     theta_spacing = 2
     phi_spacing = 2
+    detail = lod.LODController(target_fps=60)  # Picks the spacing from frame time and zoom
+    clock = pygame.time.Clock()  # Measures how long each frame took
 
     # Torus radii
     R1, R2 = 1.1, 2.5
@@ -45,6 +42,7 @@ def run_donut():
 
     # Characters used in ASCII mode
     CHARACTERS = list("RAM")
+    char_mode_index = 0  # Seeded random, luminance ramp or theta bands
 
     # Load font for ASCII rendering
     font = pygame.font.SysFont('NK57 Monospace Cd Bd.otf', 18)
@@ -60,18 +58,9 @@ def run_donut():
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Donut with UI")
 
-    # Function to normalize a vector
-    def normalize(v):
-        l = math.sqrt(sum(i*i for i in v))
-        return [i / l for i in v]
-
-    # Function to calculate dot product of two vectors
-    def dot(a, b):
-        return sum(i * j for i, j in zip(a, b))
-
-    # Function to interpolate between two colors
-    def lerp_color(c1, c2, t):
-        return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
+    # Depth/color grid, allocated once and reused by every frame
+    buffers = torus_engine.FrameBuffers(columns, rows)
+    presenter = torus_engine.DotPresenter(columns, rows, x_separator, y_separator, 1)
 
     run = True  # Control loop
     hue = 0     # Hue value for rotation
@@ -90,11 +79,13 @@ def run_donut():
             f"THEME (T): {['Metallic', 'Rendered', 'Normal'][theme_index]}",
             f"HUE (H): {'ON' if hue_rotation_enabled else 'OFF'}",
             f"SPEED (UP/DOWN): {spin_speed:.2f}",
-            f"DETAIL (D): {theta_spacing}",
+            f"DETAIL (D): {theta_spacing}x{phi_spacing}",
+            f"AUTO LOD (O): {'ON' if detail.enabled else 'OFF'}",
             f"ZOOM (Z): {zoom_factor:.2f}",
             f"RESET (R)",
             f"LIGHT (L): {light_directions[light_dir_index]}",
             f"ASCII (A): {'ON' if ascii_mode else 'OFF'}",
+            f"CHARS (C): {torus_engine.CHARACTER_MODES[char_mode_index].upper()}",
             f"ESC: EXIT"
         ]
         y_offset_ui = 20
@@ -103,88 +94,36 @@ def run_donut():
             screen.blit(rendered, (20, y_offset_ui))
             y_offset_ui += 25
 
-        # Buffers for depth, color, and ASCII characters
-        zbuffer = [0.0] * screen_size
-        colorbuffer = [(0, 0, 0)] * screen_size
-        charbuffer = [' '] * screen_size
-
-        # Torus rendering loop
-        for theta_deg in range(0, 360, theta_spacing):
-            theta = math.radians(theta_deg)
-            cost, sint = math.cos(theta), math.sin(theta)
-
-            for phi_deg in range(0, 360, phi_spacing):
-                phi = math.radians(phi_deg)
-                cosp, sinp = math.cos(phi), math.sin(phi)
-
-                # 3D coordinates of the point on torus
-                circlex = R2 + R1 * cost
-                circley = R1 * sint
-
-                # 3D rotation transformations
-                x = circlex * (math.cos(B) * cosp + math.sin(A) * math.sin(B) * sinp) - circley * math.cos(A) * math.sin(B)
-                y = circlex * (math.sin(B) * cosp - math.sin(A) * math.cos(B) * sinp) + circley * math.cos(A) * math.cos(B)
-                z = 5 + circlex * math.cos(A) * sinp + circley * math.sin(A)
-
-                ooz = 1 / z  # Depth handling
-                xp = int(x_offset + zoom_factor * 80 * ooz * x)
-                yp = int(y_offset + zoom_factor * 40 * ooz * y)
-                idx = xp + columns * yp  # Index in buffers
-
-                # Lighting calculation
-                nx = cost * cosp
-                ny = cost * sinp
-                nz = sint
-                norm = normalize([nx, ny, nz])
-                lum = dot(norm, normalize(light))
-                lum = max(0, min(1, lum))  # Clamp luminance
-
-                # Z-buffer check to draw only nearest pixel
-                if 0 <= xp < columns and 0 <= yp < rows and ooz > zbuffer[idx]:
-                    zbuffer[idx] = ooz  # Save depth
-
-                    # Shade between shadow, mid, and highlight
-                    base = lerp_color(SHADOW_COLOR, MID_COLOR, lum) if lum < 0.5 else lerp_color(MID_COLOR, HIGHLIGHT_COLOR, (lum - 0.5) * 2)
-                    depth_shade = 0.8 + 0.7 * ooz  # Further = darker
-                    shaded = tuple(min(255, int(c * depth_shade)) for c in base)
-
-                    # Convert to HSV and apply hue shift if enabled
-                    r, g, b = [c / 255 for c in shaded]
-                    h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                    if hue_rotation_enabled:
-                        h = (h + hue) % 1.0
-                    final_color = tuple(int(c * 255) for c in colorsys.hsv_to_rgb(h, s, v))
-
-                    # Store final color and ASCII character
-                    colorbuffer[idx] = final_color
-                    charbuffer[idx] = random.choice(CHARACTERS)
-
-        # Rendering the screen from buffers
-        x_pos = y_pos = 0
-        for i in range(screen_size):
-            if colorbuffer[i] != (0, 0, 0):
-                color = colorbuffer[i]
-                if ascii_mode:
-                    # Render character in ASCII mode
-                    char = charbuffer[i]
-                    text_surface = font.render(char, True, color)
-                    center = (x_pos + x_separator // 2, y_pos + y_separator // 2)
-                    screen.blit(text_surface, center)
-                else:
-                    # Render as dot/circle
-                    center = (x_pos + x_separator // 2, y_pos + y_separator // 2)
-                    pygame.draw.circle(screen, color, center, 1)
-
-            # Move to next grid point
-            if (i + 1) % columns == 0:
-                x_pos = 0
-                y_pos += y_separator
-            else:
-                x_pos += x_separator
+        # Torus samples come from the cache; the detail key (D) only changes the key
+        geometry = torus_engine.get_geometry(R1, R2, theta_spacing, phi_spacing)
+        torus_engine.prepare_lights(geometry, light_directions)  # no-op once built
+
+        # Shade between shadow, mid, and highlight; the HSV round trip always runs
+        cells, colors = torus_engine.render_torus(
+            geometry, A, B, 0.0, buffers, light,
+            (SHADOW_COLOR, MID_COLOR, HIGHLIGHT_COLOR),
+            hue=hue if hue_rotation_enabled else 0.0, zoom=zoom_factor,
+            low_gain=1, depth_base=0.8, depth_gain=0.7)
+
+        # Rendering the screen from the resolved cells
+        if ascii_mode:
+            # Render characters in ASCII mode from the pre-rendered glyph atlas
+            atlas = torus_engine.get_glyph_atlas(font, CHARACTERS)
+            char_indices = torus_engine.assign_characters(
+                torus_engine.CHARACTER_MODES[char_mode_index], len(CHARACTERS), buffers, geometry, light)
+            atlas.draw(screen, cells, colors, char_indices, columns, x_separator, y_separator)
+        else:
+            # Render as dots, stamped into one surface
+            screen.blit(presenter.present(buffers), (0, 0))
 
         # Refresh display
         pygame.display.flip()
 
+        # Let the LOD controller pick the detail for the next frame
+        clock.tick()
+        if detail.enabled:
+            theta_spacing, phi_spacing = detail.update(clock.get_rawtime(), zoom_factor)
+
         # Rotate angles to animate donut
         A += 0.02 * spin_speed
         B += 0.01 * spin_speed
@@ -207,6 +146,7 @@ def run_donut():
                 if event.key == pygame.K_d:
                     theta_spacing = max(1, theta_spacing - 1)
                     phi_spacing = max(1, phi_spacing - 1)  # Increase detail
+                    detail.enabled = False  # Manual detail overrides the controller
                 if event.key == pygame.K_r:
                     # Reset to defaults
                     theme_index = 0
@@ -214,10 +154,16 @@ def run_donut():
                     theta_spacing, phi_spacing = 2, 2
                     zoom_factor = 1.0
                     hue_rotation_enabled = False
+                    detail.reset()
+                    detail.enabled = True
                 if event.key == pygame.K_z:
                     zoom_factor = 1.5 if zoom_factor == 1.0 else 1.0  # Toggle zoom
                 if event.key == pygame.K_a:
                     ascii_mode = not ascii_mode  # Toggle ASCII rendering
+                if event.key == pygame.K_c:
+                    char_mode_index = (char_mode_index + 1) % len(torus_engine.CHARACTER_MODES)  # Cycle character modes
+                if event.key == pygame.K_o:
+                    detail.enabled = not detail.enabled  # Toggle adaptive detail
                 if event.key == pygame.K_l:
                     light_dir_index = (light_dir_index + 1) % len(light_directions)  # Change light direction
 
@@ -0,0 +1,71 @@
+import math
+
+# Adaptive level of detail: the theta/phi spacing is picked every frame so the
+# render keeps up with a target frame rate, with more samples when zoomed in.
+
+# (theta_spacing, phi_spacing) from finest to coarsest. A phi ring is about
+# twice as long on screen as the tube circle, so phi gets the denser steps.
+LOD_LEVELS = [(1, 1), (2, 1), (2, 2), (3, 2), (4, 2), (4, 3), (5, 4), (6, 5), (8, 6)]
+REFERENCE_LEVEL = 2  # the hand-tuned 2x2 spacing, right for zoom 1.0
+
+
+def samples(level):
+    """Torus samples per frame at `level`"""
+    theta_spacing, phi_spacing = LOD_LEVELS[level]
+    return len(range(0, 360, theta_spacing)) * len(range(0, 360, phi_spacing))
+
+
+def zoom_level(zoom, reference=REFERENCE_LEVEL):
+    """Level whose sample count best matches the projected area at `zoom`"""
+    wanted = samples(reference) * zoom * zoom
+    return min(range(len(LOD_LEVELS)), key=lambda level: abs(math.log(samples(level) / wanted)))
+
+
+class LODController:
+    """Frame-time feedback on top of the zoom preference, with hysteresis
+
+    `cap` is the finest level the machine keeps up with. It coarsens as soon as
+    the average work time of a `window` of frames goes over budget, and only
+    refines while it is the limiting factor and the frames come in under
+    `headroom` of the budget.
+    """
+
+    def __init__(self, target_fps=60, window=20, headroom=0.6):
+        self.enabled = True
+        self.budget_ms = 1000 / target_fps
+        self.window = window
+        self.headroom = headroom
+        self.cap = REFERENCE_LEVEL
+        self.level = REFERENCE_LEVEL
+        self._times = []
+
+    @property
+    def spacing(self):
+        return LOD_LEVELS[self.level]
+
+    def reset(self):
+        self.cap = self.level = REFERENCE_LEVEL
+        self._times.clear()
+
+    def update(self, frame_ms, zoom=1.0):
+        """Feed the last frame's work time (no idle wait); returns the spacing for the next"""
+        if not self.enabled:
+            return self.spacing
+        self._times.append(frame_ms)
+        if len(self._times) >= self.window:
+            average = sum(self._times) / len(self._times)
+            if average > self.budget_ms:
+                self.cap = min(self.level + 1, len(LOD_LEVELS) - 1)
+            elif average < self.budget_ms * self.headroom and self.level == self.cap and self.cap > 0:
+                self.cap -= 1
+            self._times.clear()
+        level = max(zoom_level(zoom), self.cap)
+        if level != self.level:
+            self._times.clear()  # the old level's times say nothing about the new one
+        self.level = level
+        return self.spacing
+
+    def label(self):
+        theta_spacing, phi_spacing = self.spacing
+        mode = "AUTO" if self.enabled else "FIXED"
+        return f"{theta_spacing}x{phi_spacing} {mode} ({samples(self.level)} samples)"
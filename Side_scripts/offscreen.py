@@ -0,0 +1,91 @@
+import os
+import time
+import numpy as np
+import pygame
+import scene_manager
+
+# Headless rendering: the donut scripts draw into a plain pygame Surface
+# instead of a window, so frames can be rendered on machines without a display.
+
+
+def headless():
+    """Use SDL's dummy video/audio drivers unless a display is already up; starts display and font only"""
+    if not pygame.display.get_init():
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    scene_manager.init()
+
+
+def spin_schedule(frames, step=(0.02, 0.01, 0.0), start=(0.0, 0.0, 0.0)):
+    """(A, B, C) for each of `frames` frames, advancing by `step` every frame"""
+    return [tuple(s + i * d for s, d in zip(start, step)) for i in range(frames)]
+
+
+class FrameSink:
+    """Offscreen target for one (A, B, C) schedule
+
+    Keeps the rendered frames as an RGB array and/or PNG files and times each
+    frame (capture excluded), so the same run doubles as a benchmark.
+    """
+
+    def __init__(self, schedule, output=None, keep=True):
+        self.schedule = schedule
+        self.output = output
+        self.keep = keep
+        self.count = 0
+        self.surface = None
+        self.frames = None
+        self.frame_times = []  # seconds per frame, capture excluded
+        self._started = None
+        if output:
+            os.makedirs(output, exist_ok=True)
+
+    def open(self, size):
+        """Surface to draw into instead of the window"""
+        headless()
+        self.surface = pygame.Surface(size)
+        if self.keep:
+            # (frames, height, width, 3) RGB, filled in as frames arrive
+            self.frames = np.empty((len(self.schedule), size[1], size[0], 3), dtype=np.uint8)
+        self._started = time.perf_counter()
+        return self.surface
+
+    @property
+    def angles(self):
+        """(A, B, C) of the frame about to be drawn"""
+        return self.schedule[self.count]
+
+    @property
+    def done(self):
+        return self.count >= len(self.schedule)
+
+    def add(self):
+        """Capture the surface as the next frame"""
+        self.frame_times.append(time.perf_counter() - self._started)
+        if self.frames is not None:
+            self.frames[self.count] = pygame.surfarray.array3d(self.surface).swapaxes(0, 1)
+        if self.output:
+            pygame.image.save(self.surface, os.path.join(self.output, f"frame_{self.count:05d}.png"))
+        self.count += 1
+        self._started = time.perf_counter()
+
+
+def render(name, frames, output=None, step=(0.02, 0.01, 0.0)):
+    """Render `frames` frames of one of the donut scripts without a window"""
+    headless()
+    module = __import__(name)
+    return module.run_donut(FrameSink(spin_schedule(frames, step), output))
+
+
+if __name__ == "__main__":
+    import sys
+
+    # usage: python offscreen.py <script> [frames] [output dir]
+    name = sys.argv[1].removesuffix(".py") if len(sys.argv) > 1 else "DonW"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    output = sys.argv[3] if len(sys.argv) > 3 else None
+    start = time.perf_counter()
+    rendered = render(name, count, output)
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {len(rendered)} frames {rendered.shape[2]}x{rendered.shape[1]} "
+          f"in {elapsed:.2f}s ({elapsed / count * 1000:.1f} ms/frame)")
@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+import numpy as np
+import torus_engine
+import frame_profiler
+
+# Multi-core rendering: the theta rings are split across worker processes, each
+# z-tests and shades its share into its own plane of one shared-memory block,
+# and the planes are merged by keeping the nearest (largest 1/z) sample per cell.
+
+def _planes(buf, workers, cells):
+    """(depth, color, winners) arrays of `workers` planes laid out in `buf`"""
+    depth = np.ndarray((workers, cells), dtype=np.float64, buffer=buf)
+    winners = np.ndarray((workers, cells), dtype=np.int64, buffer=buf, offset=depth.nbytes)
+    color = np.ndarray((workers, cells, 3), dtype=np.uint8, buffer=buf, offset=depth.nbytes + winners.nbytes)
+    return depth, color, winners
+
+
+def _work(conn, name, index, workers, columns, rows):
+    """Worker process: render its geometry slice into plane `index` for every request"""
+    shm = shared_memory.SharedMemory(name=name)
+    depth, color, winners = _planes(shm.buf, workers, columns * rows)
+    buffers = torus_engine.FrameBuffers(columns, rows)
+    buffers.depth, buffers.color = depth[index], color[index]
+    geometry = None
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        part, args, options = request
+        if part is not None:
+            geometry = part
+        cells, _ = torus_engine.render_torus(geometry, *args[:3], buffers, *args[3:], **options)
+        winners[index, cells] = buffers.winners + geometry.start
+        conn.send((buffers.samples, buffers.offscreen, buffers.occluded, buffers.culled))
+    del depth, color, winners, buffers
+    shm.close()
+
+
+class ParallelRenderer:
+    """render_torus with the geometry split by theta over `workers` processes
+
+    The result is merged into an ordinary FrameBuffers, so presenters, glyph
+    atlases and assign_characters work unchanged, and it matches the
+    single-process render cell for cell.
+    """
+
+    def __init__(self, columns, rows, workers=None):
+        self.columns, self.rows = columns, rows
+        self.workers = workers or os.cpu_count() or 1
+        cells = columns * rows
+        self._shm = shared_memory.SharedMemory(create=True, size=self.workers * cells * (8 + 8 + 3))
+        self.depth, self.color, self.winners = _planes(self._shm.buf, self.workers, cells)
+        self.depth.fill(0)
+        self._geometry = None
+        self._connections, self._processes = [], []
+        for index in range(self.workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_work, args=(child, self._shm.name, index, self.workers,
+                                                                  columns, rows), daemon=True)
+            process.start()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def render(self, geometry, A, B, C, buffers, light, palette, profiler=None, **options):
+        """Same arguments and result as torus_engine.render_torus"""
+        stage = profiler.stage if profiler is not None else frame_profiler.untimed
+        if options.get("cull") is None:
+            options["cull"] = torus_engine.backface_culling  # the workers' copy may differ
+        with stage("workers"):
+            parts = [None] * self.workers
+            if geometry is not self._geometry:
+                parts = torus_engine.split_geometry(geometry, self.workers)
+                self._geometry = geometry
+            for connection, part in zip(self._connections, parts):
+                connection.send((part, (A, B, C, light, palette), options))
+            stats = np.array([connection.recv() for connection in self._connections]).sum(axis=0)
+        with stage("reduce"):
+            # Nearest plane per cell; argmax keeps the first (lowest theta) plane on ties
+            best = self.depth.argmax(axis=0)
+            nearest = np.take_along_axis(self.depth, best[None], axis=0)[0]
+            cells = np.flatnonzero(nearest > 0)
+            best = best[cells]
+            buffers.clear()
+            buffers.depth[cells] = buffers.ooz = nearest[cells]
+            colors = self.color[best, cells]
+            buffers.color[cells] = colors
+            buffers.cells, buffers.winners = cells, self.winners[best, cells]
+        buffers.samples, buffers.offscreen, buffers.occluded, buffers.culled = stats.tolist()
+        for key, value in zip(("samples", "offscreen", "occluded", "culled"), stats.tolist()):
+            torus_engine.frame_counters[key] += value
+        torus_engine.frame_counters["frames"] += 1
+        return cells, colors
+
+    def close(self):
+        """Stop the workers and release the shared block"""
+        for connection in self._connections:
+            connection.send(None)
+        for process in self._processes:
+            process.join()
+        del self.depth, self.color, self.winners
+        self._shm.close()
+        self._shm.unlink()
+
+
+def parity(columns=320, rows=90, spacing=(2, 2), workers=4, frames=5):
+    """Cells whose depth or color differ between the merged and the single-process render"""
+    geometry = torus_engine.get_geometry(1.1, 2.5, *spacing)
+    palette = ((30, 40, 80), (180, 180, 200), (220, 240, 255))
+    single = torus_engine.FrameBuffers(columns, rows)
+    merged = torus_engine.FrameBuffers(columns, rows)
+    renderer = ParallelRenderer(columns, rows, workers)
+    mismatches = 0
+    try:
+        for i in range(frames):
+            angles = (0.3 + 0.4 * i, 0.2 + 0.3 * i, 0.1 * i)
+            torus_engine.render_torus(geometry, *angles, single, [0, 1, -1], palette, hue=0.1, zoom=1.5)
+            renderer.render(geometry, *angles, merged, [0, 1, -1], palette, hue=0.1, zoom=1.5)
+            mismatches += int(((single.depth != merged.depth) | (single.color != merged.color).any(axis=1)).sum())
+            if not np.array_equal(single.winners, merged.winners):
+                mismatches += 1  # same picture from different samples would break the character modes
+    finally:
+        renderer.close()
+    return mismatches
+
+
+if __name__ == "__main__":
+    import sys
+
+    # usage: python parallel_render.py [workers]
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    print(f"{workers} workers: {parity(workers=workers)} mismatched cells")
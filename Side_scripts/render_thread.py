@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+import torus_engine
+
+# Producer/consumer frame pipeline: a worker thread renders the next frame while
+# the main thread handles events and presents the current one. NumPy releases
+# the GIL in the heavy parts of render_torus, so the two overlap.
+
+
+class RenderPipeline:
+    """Two FrameBuffers swapped between a render worker and the presenting thread
+
+    `render(buffers, snapshot)` runs on the worker for the newest snapshot passed
+    to `submit`. The worker only ever writes the back buffers and the main thread
+    only reads `front`; `acquire` swaps the two references, so no frame is copied.
+    A finished frame waits for that swap; meanwhile newer snapshots replace each
+    other and count as dropped.
+    """
+
+    def __init__(self, render, columns, rows, window=120):
+        self.render = render
+        self.front = torus_engine.FrameBuffers(columns, rows)
+        self._back = torus_engine.FrameBuffers(columns, rows)
+        self._snapshot = None  # submitted but not picked up yet
+        self._busy = False  # worker is rendering into the back buffers
+        self._ready = False  # back buffers hold a finished, unpresented frame
+        self._running = True
+        self._error = None  # exception raised by `render`, re-raised by acquire
+        self._cond = threading.Condition()
+        # Statistics: dropped counts snapshots superseded before rendering,
+        # repeated counts presents without a new frame
+        self.submitted = self.rendered = self.presented = self.dropped = self.repeated = 0
+        self.depths = deque(maxlen=window)  # frames in flight at each submit
+        self.render_times = deque(maxlen=window)  # worker ms per frame
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+        self._thread.start()
+
+    def _in_flight(self):
+        return (self._snapshot is not None) + self._busy + self._ready
+
+    @property
+    def pending(self):
+        """Whether a submitted frame has not been presented yet"""
+        with self._cond:
+            return self._in_flight() > 0
+
+    def submit(self, snapshot):
+        """Queue a frame; an older snapshot still waiting is replaced"""
+        with self._cond:
+            if self._snapshot is not None:
+                self.dropped += 1
+            self._snapshot = snapshot
+            self.submitted += 1
+            self.depths.append(self._in_flight())
+            self._cond.notify_all()
+
+    def acquire(self, block=False):
+        """Front buffers holding the newest finished frame
+
+        Without a new frame the previous one is returned again; `block` waits
+        for every submitted snapshot to be rendered first (offscreen runs).
+        """
+        with self._cond:
+            while True:
+                if block:
+                    self._cond.wait_for(lambda: self._ready or self._error is not None
+                                        or (self._snapshot is None and not self._busy))
+                if self._error is not None:
+                    raise self._error
+                if not self._ready:
+                    self.repeated += 1
+                    return self.front
+                self.front, self._back = self._back, self.front
+                self._ready = False
+                self._cond.notify_all()
+                if not block or (self._snapshot is None and not self._busy):
+                    self.presented += 1
+                    return self.front
+                self.dropped += 1  # an older frame, the caller wants the newest
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: (self._snapshot is not None and not self._ready)
+                                    or not self._running)
+                if not self._running:
+                    return
+                snapshot, self._snapshot = self._snapshot, None
+                self._busy = True
+                buffers = self._back
+            start = time.perf_counter()
+            try:
+                self.render(buffers, snapshot)
+            except Exception as error:
+                with self._cond:
+                    self._error = error
+                    self._busy = self._running = False
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self.render_times.append((time.perf_counter() - start) * 1000)
+                self.rendered += 1
+                self._busy = False
+                self._ready = True
+                self._cond.notify_all()
+
+    def stats(self):
+        """Counters plus mean/max queue depth and mean worker ms"""
+        with self._cond:
+            depths, times = list(self.depths), list(self.render_times)
+            return {
+                "submitted": self.submitted,
+                "rendered": self.rendered,
+                "presented": self.presented,
+                "dropped": self.dropped,
+                "repeated": self.repeated,
+                "queue_depth": sum(depths) / len(depths) if depths else 0.0,
+                "max_queue_depth": max(depths, default=0),
+                "render_ms": sum(times) / len(times) if times else 0.0,
+            }
+
+    def close(self):
+        """Stop the worker once its current frame is done"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
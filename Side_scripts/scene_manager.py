@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+import pygame
+import frame_profiler
+
+# One window for the launcher and every scene it opens: scenes are objects with
+# enter/update/render/exit hooks that are switched without re-creating the
+# display, and fonts are loaded once per (path, size) and shared between them.
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "NK57 Monospace Cd Bd.otf")
+
+_fonts = {}
+_imported = time.perf_counter()
+
+# Cold-start timeline: (milestone, ms since the process was launched)
+startup = []
+
+
+def init():
+    """Start only the display and font subsystems; pygame.init also starts audio, joysticks and more"""
+    pygame.display.init()
+    pygame.font.init()
+
+
+def process_age_ms():
+    """Milliseconds since the process was launched (Linux), else since this module was imported"""
+    try:
+        with open("/proc/self/stat") as file:
+            start_ticks = int(file.read().rsplit(")", 1)[1].split()[19])
+        return (time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, AttributeError):
+        return (time.perf_counter() - _imported) * 1000
+
+
+def mark(milestone):
+    """Add `milestone` to the cold-start timeline"""
+    startup.append((milestone, process_age_ms()))
+
+
+def get_font(path, size):
+    """pygame Font for `path` at `size`, loaded on first use and then shared"""
+    font = _fonts.get((path, size))
+    if font is None:
+        font = _fonts[(path, size)] = pygame.font.Font(path, size)
+    return font
+
+
+class Scene:
+    """Base for the scenes run by SceneManager; each hook may be overridden"""
+
+    name = "scene"
+    caption = None
+    fps = 60
+    profiler = None  # FrameProfiler that also times the manager's flip, idle and events
+
+    def prewarm(self, cancelled):
+        """Build caches and the first frame ahead of enter, on a background thread
+
+        Long work should return early once `cancelled()` is true.
+        """
+
+    def enter(self, manager):
+        """Became the active scene; `manager.screen` is the surface to draw on"""
+
+    def update(self, events):
+        """Handle one frame of events; returning False ends the scene"""
+        return True
+
+    def render(self, screen):
+        """Draw the next frame"""
+
+    def exit(self):
+        """Stopped being the active scene"""
+
+
+class Prewarm:
+    """Speculative `make()` and `scene.prewarm` on a worker thread, until taken or cancelled
+
+    `make` runs on the worker too, so a scene module imported lazily there
+    never stalls the calling thread.
+    """
+
+    def __init__(self, name, make):
+        self.name = name
+        self.scene = None
+        self.warm_ms = None  # worker time once finished
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(make,), name=f"prewarm {name}", daemon=True)
+        self._thread.start()
+
+    def _run(self, make):
+        start = time.perf_counter()
+        try:
+            self.scene = make()
+            if not self._cancel.is_set():
+                self.scene.prewarm(self._cancel.is_set)
+        finally:
+            self.warm_ms = (time.perf_counter() - start) * 1000
+
+    def cancel(self):
+        """Drop the warm-up; the worker stops at its next check"""
+        self._cancel.set()
+
+    def take(self):
+        """The warmed scene and the ms of warm-up that no longer delay the switch"""
+        start = time.perf_counter()
+        self._thread.join()
+        return self.scene, max(0.0, self.warm_ms - (time.perf_counter() - start) * 1000)
+
+
+class SceneManager:
+    """Runs a stack of scenes on one display surface
+
+    `push` starts a scene on top of the current one, and a scene that ends
+    hands the display back to the one below it. Every switch is timed from the
+    request to the flip of the new scene's first frame.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.clock = pygame.time.Clock()
+        self.stack = []
+        self.switch_times = []  # (from, to, ms) for every switch
+        self.first_frame = False
+        self._switching = None  # (from, started) until the new scene's first flip
+
+    @property
+    def scene(self):
+        return self.stack[-1] if self.stack else None
+
+    def _activate(self, previous):
+        self._switching = (previous.name if previous is not None else None, time.perf_counter())
+        if previous is not None:
+            previous.exit()
+        if self.scene is not None:
+            if self.scene.caption:
+                pygame.display.set_caption(self.scene.caption)
+            self.scene.enter(self)
+
+    def push(self, scene):
+        """Switch to `scene`; the current scene resumes when it ends"""
+        previous = self.scene
+        self.stack.append(scene)
+        self._activate(previous)
+
+    def pop(self):
+        """End the current scene and return to the one below it"""
+        self._activate(self.stack.pop())
+
+    def run(self, scene):
+        """Run `scene` and whatever it pushes until the stack is empty or the window closes"""
+        self.push(scene)
+        while self.stack:
+            scene = self.scene
+            stage = scene.profiler.stage if scene.profiler is not None else frame_profiler.untimed
+            scene.render(self.screen)
+            with stage("flip"):
+                pygame.display.flip()
+            if not self.first_frame:
+                self.first_frame = True
+                mark("first frame")
+            if self._switching is not None:
+                previous, started = self._switching
+                self.switch_times.append((previous, scene.name, (time.perf_counter() - started) * 1000))
+                self._switching = None
+            with stage("idle"):
+                self.clock.tick(scene.fps)
+            with stage("events"):
+                events = pygame.event.get()
+            if any(event.type == pygame.QUIT for event in events):
+                while self.stack:
+                    self.stack.pop().exit()
+            elif scene.update(events) is False and scene is self.scene:
+                self.pop()
+
+    def last_switch_ms(self):
+        """Latency of the most recent switch, or None"""
+        return self.switch_times[-1][2] if self.switch_times else None
@@ -0,0 +1,47 @@
+import math
+import pygame
+
+# Dirty-frame detection for the interactive loops: each frame hashes whatever
+# reaches the screen, and when that is unchanged the last frame stays up and
+# the loop blocks on input instead of redrawing it at 60 fps.
+
+HUE_STEP = 1 / 90  # the hue drift is hashed in 4 degree steps
+HUE_RATE = 0.004 * 60 / 1000  # hue per ms: the loops' 0.004 per 60 fps frame
+EXPOSE_EVENTS = {pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED}
+
+
+class SceneState:
+    """Hash of the frame on screen; `dirty` says whether a new one is needed"""
+
+    def __init__(self, hue_step=HUE_STEP):
+        self.hue_step = hue_step
+        self.key = None
+        self.drawn = self.skipped = 0
+
+    def dirty(self, *state, hue=None):
+        """True when `state` (hashable values) and `hue` differ from the frame on screen"""
+        key = hash((state, None if hue is None else round(hue / self.hue_step)))
+        if key == self.key:
+            self.skipped += 1
+            return False
+        self.key = key
+        self.drawn += 1
+        return True
+
+    def invalidate(self):
+        """Force a redraw, e.g. after the window contents were lost"""
+        self.key = None
+
+    def hue_timeout(self, hue, rate=HUE_RATE):
+        """Milliseconds until a hue drifting at `rate` per ms reaches the next hashed step"""
+        boundary = (round(hue / self.hue_step) + 0.5) * self.hue_step
+        return max(1, math.ceil((boundary - hue) / rate))
+
+    def wait(self, timeout=None):
+        """Sleep until input arrives (or `timeout` ms pass) and return the pending events"""
+        event = pygame.event.wait() if timeout is None else pygame.event.wait(timeout)
+        events = [] if event.type == pygame.NOEVENT else [event]
+        events += pygame.event.get()
+        if any(event.type in EXPOSE_EVENTS for event in events):
+            self.invalidate()
+        return events
@@ -1,6 +1,17 @@
 import pygame
-import DonW
+import importlib
+import math
 import os
+import sys
+
+# The scenes and the shared torus engine live in Side_scripts; scene modules
+# are imported on first use, see load_scene
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "Side_scripts"))
+import torus_engine
+import frame_ring
+import scene_manager
+
+scene_manager.mark("imports")
 
 # Settings
 WIDTH, HEIGHT = 1280, 720
@@ -13,121 +24,132 @@ TEXT_COLOR = (220, 240, 255)
 OPTION_COLOR = (80, 120, 200)
 OPTION_HOVER = (120, 180, 255)
 
-FONT_PATH = os.path.join(os.path.dirname(__file__), "NK57 Monospace Cd Bd.otf")
+FONT_PATH = scene_manager.FONT_PATH  # the scenes' font, so equal sizes are loaded once
 FONT_SIZE = 28
 SMALL_FONT_SIZE = 20
 
+# Launch to first frame should stay within this
+STARTUP_BUDGET_MS = 1000
+
+# Scene name -> (module, Scene class), imported when first needed
+SCENES = {"DonW": ("DonW", "DonWScene")}
+
 # Donut rendering parameters (simplified for background)
 DONUT_XSEP, DONUT_YSEP = 6, 12
 DONUT_R1, DONUT_R2 = 1.1, 2.5
 DONUT_THETA_SPACING = 4
 DONUT_PHI_SPACING = 4
+DONUT_LIGHT = [0, 1, -1]
+DONUT_PALETTE = ((30, 40, 80), (180, 180, 200), (220, 240, 255))
+
+# The background motion is fixed, so it is baked once into a loop of frames.
+# The steps are rounded so the loop closes: two turns of A, one of B and of the hue
+DONUT_RING_FRAMES = 500
+DONUT_A_STEP = 4 * math.pi / DONUT_RING_FRAMES  # ~0.025 per frame
+DONUT_B_STEP = 2 * math.pi / DONUT_RING_FRAMES  # ~0.012 per frame
+DONUT_HUE_STEP = 1 / DONUT_RING_FRAMES  # 0.002 per frame
+# A frame_archive path (--archive PATH) keeps the baked loop between runs
+DONUT_RING_CACHE = sys.argv[sys.argv.index("--archive") + 1] if "--archive" in sys.argv[1:-1] else None
 
-pygame.init()
+scene_manager.init()
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Symmetry Visualizer")
-font = pygame.font.Font(FONT_PATH, FONT_SIZE)
-small_font = pygame.font.Font(FONT_PATH, SMALL_FONT_SIZE)
+scene_manager.mark("display")
+font = scene_manager.get_font(FONT_PATH, FONT_SIZE)
+small_font = scene_manager.get_font(FONT_PATH, SMALL_FONT_SIZE)
+
+# Donut background state: position in the baked loop
+donut_frame = 0
 
-# Donut background state
-A, B = 0.0, 0.0
-hue = 0
+def render_donut_frame(buffers, index):
+    """Frame `index` of the background loop"""
+    A, B = index * DONUT_A_STEP, index * DONUT_B_STEP
+    donut_geometry = torus_engine.get_geometry(DONUT_R1, DONUT_R2, DONUT_THETA_SPACING, DONUT_PHI_SPACING)
+    # Simple rotation for background, pushed further back than the scenes
+    torus_engine.render_torus(
+        donut_geometry, A, B, 0.0, buffers, DONUT_LIGHT, DONUT_PALETTE,
+        hue=index * DONUT_HUE_STEP, distance=8, rotation=torus_engine.euler_matrix(A, B))
+
+# Baked background loop, replaced by init_donut_bg
+donut_ring = None
+
+def init_donut_bg(bake=True):
+    """Allocate the background grid for the current WIDTH/HEIGHT and DONUT_* settings
+
+    The previous ring stops baking first; with `bake` False the new one waits for resume().
+    """
+    global donut_buffers, donut_presenter, donut_ring
+    if donut_ring is not None:
+        donut_ring.close()
+    columns, rows = WIDTH // DONUT_XSEP, HEIGHT // DONUT_YSEP
+    donut_buffers = torus_engine.FrameBuffers(columns, rows)
+    donut_presenter = torus_engine.DotPresenter(columns, rows, DONUT_XSEP, DONUT_YSEP,
+                                               min(DONUT_XSEP, DONUT_YSEP) // 2)
+    params = {"scene": "launcher", "R1": DONUT_R1, "R2": DONUT_R2, "separators": [DONUT_XSEP, DONUT_YSEP],
+              "spacing": [DONUT_THETA_SPACING, DONUT_PHI_SPACING], "light": DONUT_LIGHT, "theme": DONUT_PALETTE,
+              "steps": [DONUT_A_STEP, DONUT_B_STEP, DONUT_HUE_STEP]}
+    donut_ring = frame_ring.FrameRing(render_donut_frame, DONUT_RING_FRAMES, columns, rows,
+                                      DONUT_RING_CACHE, params, bake)
+
+init_donut_bg()
 
 def draw_donut_bg(surface):
-    global A, B, hue
-    cols = WIDTH // DONUT_XSEP
-    rows = HEIGHT // DONUT_YSEP
-    x_offset = cols / 2
-    y_offset = rows / 2
-    zbuffer = [0.0] * (cols * rows)
-    colorbuffer = [(0, 0, 0)] * (cols * rows)
-    SHADOW_COLOR = (30, 40, 80)
-    MID_COLOR = (180, 180, 200)
-    HIGHLIGHT_COLOR = (220, 240, 255)
-    light = [0, 1, -1]
-    import math, colorsys
-    def normalize(v):
-        l = math.sqrt(sum(i*i for i in v))
-        return [i / l for i in v] if l != 0 else v
-    def dot(a, b):
-        return sum(i * j for i, j in zip(a, b))
-    def lerp_color(c1, c2, t):
-        return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
-    for theta_deg in range(0, 360, DONUT_THETA_SPACING):
-        theta = math.radians(theta_deg)
-        cost, sint = math.cos(theta), math.sin(theta)
-        for phi_deg in range(0, 360, DONUT_PHI_SPACING):
-            phi = math.radians(phi_deg)
-            cosp, sinp = math.cos(phi), math.sin(phi)
-            circlex = DONUT_R2 + DONUT_R1 * cost
-            circley = DONUT_R1 * sint
-            x = circlex * cosp
-            y = circley
-            z = circlex * sinp
-            # Simple rotation for background
-            x_rot = x * math.cos(B) - z * math.sin(B)
-            z_rot = x * math.sin(B) + z * math.cos(B)
-            y_rot = y * math.cos(A) - z_rot * math.sin(A)
-            z_final = y * math.sin(A) + z_rot * math.cos(A)
-            x, y, z = x_rot, y_rot, z_final
-            z += 8
-            ooz = 1 / z
-            xp = int(x_offset + 80 * ooz * x)
-            yp = int(y_offset + 40 * ooz * y)
-            idx = xp + cols * yp
-            if 0 <= xp < cols and 0 <= yp < rows:
-                nx = cost * cosp
-                ny = cost * sinp
-                nz = sint
-                norm = normalize([nx, ny, nz])
-                lum = dot(norm, normalize(light))
-                lum = max(0, min(1, lum))
-                if ooz > zbuffer[idx]:
-                    zbuffer[idx] = ooz
-                    if lum < 0.5:
-                        base = lerp_color(SHADOW_COLOR, MID_COLOR, lum * 2)
-                    else:
-                        base = lerp_color(MID_COLOR, HIGHLIGHT_COLOR, (lum - 0.5) * 2)
-                    depth_shade = 0.7 + 0.6 * ooz
-                    shaded = tuple(int(min(255, c * depth_shade)) for c in base)
-                    r, g, b = [c / 255 for c in shaded]
-                    h, s, v = colorsys.rgb_to_hsv(r, g, b)
-                    h = (h + hue) % 1.0
-                    final_color = tuple(int(c * 255) for c in colorsys.hsv_to_rgb(h, s, v))
-                    # Ensure final_color is always a tuple of 3 elements
-                    if len(final_color) == 3:
-                        colorbuffer[idx] = (final_color[0], final_color[1], final_color[2])
-                    else:
-                        colorbuffer[idx] = (0, 0, 0)
-    donut_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    x_pos = y_pos = 0
-    radius = min(DONUT_XSEP, DONUT_YSEP) // 2
-    for i in range(cols * rows):
-        if colorbuffer[i] != (0, 0, 0):
-            center = (x_pos + DONUT_XSEP // 2, y_pos + DONUT_YSEP // 2)
-            pygame.draw.circle(donut_surface, colorbuffer[i], center, radius)
-        if (i + 1) % cols == 0:
-            x_pos = 0
-            y_pos += DONUT_YSEP
-        else:
-            x_pos += DONUT_XSEP
-    surface.blit(donut_surface, (0, 0))
-    # Animate
-    A += 0.025
-    B += 0.012
-    hue += 0.002
+    global donut_frame
+    colors = donut_ring.frame(donut_frame)
+    if colors is None:
+        # Not baked yet: draw this frame live
+        render_donut_frame(donut_buffers, donut_frame % DONUT_RING_FRAMES)
+        surface.blit(donut_presenter.present(donut_buffers), (0, 0))
+    else:
+        surface.blit(donut_presenter.present_colors(colors), (0, 0))
+    donut_frame += 1
+
+def load_scene(name):
+    """New instance of scene `name`, importing its module on first use"""
+    module, scene = SCENES[name]
+    return getattr(importlib.import_module(module), scene)()
 
 # UI state
 search_text = ""
 search_active = False
 option_rect = None
+BAR_RECT = pygame.Rect(40, 60, LEFT_PANEL_WIDTH - 80, 48)
 
-clock = pygame.time.Clock()
+# Speculative warm-ups of the matched scene: (scene, "used" or "cancelled", ms saved)
+prewarm_log = []
 
-def main():
-    global search_text, search_active, option_rect
-    running = True
-    while running:
+class LauncherScene(scene_manager.Scene):
+    """Search panel over the donut background; the chosen scene runs in the same window"""
+
+    name = "launcher"
+    caption = "Symmetry Visualizer"
+    fps = 30
+
+    def enter(self, manager):
+        self.manager = manager
+        self.warming = None  # Prewarm of the scene the search box matches
+        donut_ring.resume()  # exit stopped the bake, possibly part way
+
+    def speculate(self, matched):
+        """Warm the matched scene in the background; drop the warm-up once it stops matching"""
+        if matched and self.warming is None:
+            self.warming = scene_manager.Prewarm("DonW", lambda: load_scene("DonW"))
+        elif not matched and self.warming is not None:
+            self.warming.cancel()
+            prewarm_log.append((self.warming.name, "cancelled", 0.0))
+            self.warming = None
+
+    def launch(self):
+        """Switch to the matched scene, warmed if possible"""
+        scene, saved = None, 0.0
+        if self.warming is not None:
+            scene, saved = self.warming.take()
+            prewarm_log.append((self.warming.name, "used", saved))
+            self.warming = None
+        self.manager.push(scene if scene is not None else load_scene("DonW"))
+
+    def render(self, screen):
+        global option_rect
         screen.fill(BG_COLOR)
         draw_donut_bg(screen)
         # Draw left panel
@@ -135,14 +157,13 @@ def main():
         panel.fill(PANEL_COLOR)
         screen.blit(panel, (0, 0))
         # Draw search bar
-        bar_rect = pygame.Rect(40, 60, LEFT_PANEL_WIDTH - 80, 48)
         bar_color = SEARCH_BAR_ACTIVE if search_active else SEARCH_BAR_COLOR
-        pygame.draw.rect(screen, bar_color, bar_rect, border_radius=10)
+        pygame.draw.rect(screen, bar_color, BAR_RECT, border_radius=10)
         prompt = font.render("Which shape to visualize?", True, TEXT_COLOR)
         screen.blit(prompt, (40, 20))
         # Draw search text
         text_surf = font.render(search_text, True, TEXT_COLOR)
-        screen.blit(text_surf, (bar_rect.x + 10, bar_rect.y + 8))
+        screen.blit(text_surf, (BAR_RECT.x + 10, BAR_RECT.y + 8))
         # Draw option for DonW
         show_option = "donw" in search_text.lower() or search_text.strip() == "" or "don" in search_text.lower()
         if show_option:
@@ -156,34 +177,61 @@ def main():
             option_rect = opt_rect
         else:
             option_rect = None
-        # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if bar_rect.collidepoint(event.pos):
+        # Only a typed match is worth warming; the empty box would import DonW at startup
+        self.speculate(show_option and search_text.strip() != "")
+        # Scene switch latency, kept in milliseconds
+        switch_ms = self.manager.last_switch_ms()
+        if switch_ms is not None:
+            latency = small_font.render(f"Last scene switch: {switch_ms:.1f} ms", True, TEXT_COLOR)
+            screen.blit(latency, (40, HEIGHT - 40))
+        used = [saved for _, outcome, saved in prewarm_log if outcome == "used"]
+        if used:
+            saved = small_font.render(f"Prewarm saved: {used[-1]:.1f} ms", True, TEXT_COLOR)
+            screen.blit(saved, (40, HEIGHT - 70))
+
+    def update(self, events):
+        global search_text, search_active
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if BAR_RECT.collidepoint(event.pos):
                     search_active = True
                 else:
                     search_active = False
                 if option_rect and option_rect.collidepoint(event.pos):
-                    pygame.quit()
-                    DonW.run_donut()
-                    return
+                    self.launch()
+                    return True
             elif event.type == pygame.KEYDOWN and search_active:
                 if event.key == pygame.K_BACKSPACE:
                     search_text = search_text[:-1]
                 elif event.key == pygame.K_RETURN:
                     if option_rect:
-                        pygame.quit()
-                        DonW.run_donut()
-                        return
+                        self.launch()
+                        return True
                 elif event.key == pygame.K_ESCAPE:
                     search_active = False
                 else:
                     if len(search_text) < 20 and event.unicode.isprintable():
                         search_text += event.unicode
-        pygame.display.flip()
-        clock.tick(30)
+        return True
+
+    def exit(self):
+        # Leave the CPU to the scene; enter resumes the bake
+        donut_ring.close()
+        if self.warming is not None:
+            self.warming.cancel()
+            self.warming = None
+
+def main():
+    manager = scene_manager.SceneManager(screen)
+    manager.run(LauncherScene())
+    timeline = ", ".join(f"{milestone} {ms:.0f} ms" for milestone, ms in scene_manager.startup)
+    first_frame = dict(scene_manager.startup).get("first frame", 0.0)
+    print(f"cold start: {timeline} ({'within' if first_frame <= STARTUP_BUDGET_MS else 'over'} "
+          f"the {STARTUP_BUDGET_MS} ms budget)")
+    for previous, scene, ms in manager.switch_times:
+        print(f"{previous or 'start'} -> {scene}: {ms:.1f} ms")
+    for scene, outcome, saved in prewarm_log:
+        print(f"prewarm {scene}: {outcome}" + (f", saved {saved:.1f} ms" if outcome == "used" else ""))
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()